@@ -1,13 +1,996 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
 import subprocess
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
 import json
 import os
 import re
+import stat
+import struct
+import posixpath
+import shutil
+import signal
+import uuid
+import queue
 import threading
-from typing import List, Dict
+import collections
+import time
+from typing import List, Dict, Optional, Tuple, Union
 from datetime import datetime
 
+# 명령 하나의 최대 실행 시간 (초)
+COMMAND_TIMEOUT = 30
+
+# 로그 위젯 갱신 주기 (밀리초, 약 30Hz)
+LOG_FLUSH_INTERVAL_MS = 33
+# 한 번에 로그 위젯에 추가하는 최대 줄 수 (남은 줄은 다음 주기에 추가)
+LOG_FLUSH_MAX_LINES = 2000
+# 화면에 추가되기를 기다리는 로그 최대 줄 수 (넘으면 버리고 버린 줄 수를 표시)
+LOG_QUEUE_MAX = 50000
+# 기록 검색 결과 최대 표시 수
+LOG_SEARCH_MAX_RESULTS = 1000
+
+
+class _ExitAwareProtocol(asyncio.subprocess.SubprocessStreamProtocol):
+    """프로세스가 종료되는 즉시 완료되는 exited Future를 제공하는 프로토콜
+    
+    Process.wait()는 파이프가 모두 닫혀야 반환되므로, 파이프를 물려받은 자식
+    프로세스(adb 서버 등)가 남아 있으면 명령이 끝나도 반환되지 않습니다.
+    """
+    
+    def __init__(self, limit, loop):
+        super().__init__(limit=limit, loop=loop)
+        self.exited = loop.create_future()
+    
+    def process_exited(self):
+        super().process_exited()
+        if not self.exited.done():
+            self.exited.set_result(None)
+
+
+class CommandEngine:
+    """모든 명령의 프로세스와 stdout/stderr를 하나의 asyncio 이벤트 루프 스레드에서 처리합니다."""
+    
+    # 프로세스 종료 후 파이프에 남은 출력을 기다리는 시간 (초)
+    OUTPUT_DRAIN_TIMEOUT = 1
+    # 취소 시 종료 요청 후 강제 종료까지 기다리는 시간 (초)
+    TERMINATE_GRACE = 2
+    # 명령마다 새 프로세스 그룹을 만들어 취소 시 셸이 실행한 자식(adb 등)까지 함께 종료
+    if os.name == 'nt':
+        PROCESS_GROUP = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        PROCESS_GROUP = {"start_new_session": True}
+    # 한 줄의 최대 길이 (바이트, 넘으면 해당 줄 생략)
+    LINE_LIMIT = 1024 * 1024
+    
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="CommandEngine", daemon=True)
+        self._thread.start()
+    
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+    
+    def submit(self, coro) -> concurrent.futures.Future:
+        """코루틴을 엔진의 이벤트 루프에서 실행합니다 (어느 스레드에서든 호출 가능)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    def cancel(self, task: asyncio.Task):
+        """엔진에서 실행 중인 작업을 취소합니다 (어느 스레드에서든 호출 가능, 기다리지 않음)."""
+        self.loop.call_soon_threadsafe(task.cancel)
+    
+    async def run(self, cmd: Union[str, List[str]], on_output, timeout: float = None, on_start=None,
+                  cwd: Optional[str] = None) -> int:
+        """
+        명령을 실행하고 종료 코드를 반환합니다.
+        
+        stdout/stderr는 한 줄씩 on_output("OUT" 또는 "ERR", 줄)로 전달됩니다.
+        시간이 초과되면 asyncio.TimeoutError, 작업이 취소되면 asyncio.CancelledError가
+        발생하며, 두 경우 모두 프로세스를 종료한 뒤 예외를 전달합니다.
+        
+        Args:
+            cmd: 실행할 명령 (인자 목록이면 셸 없이 직접 실행, 문자열이면 셸로 실행)
+            on_output: 출력 줄 콜백 (이벤트 루프 스레드에서 호출됨)
+            timeout: 최대 실행 시간 (초, None이면 무제한)
+            on_start: 프로세스 시작 직후 프로세스 객체를 받는 콜백
+            cwd: 실행 디렉토리 (None이면 현재 디렉토리)
+        """
+        loop = asyncio.get_running_loop()
+        protocol_factory = lambda: _ExitAwareProtocol(self.LINE_LIMIT, loop)
+        if isinstance(cmd, str):
+            transport, protocol = await loop.subprocess_shell(
+                protocol_factory,
+                cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd,
+                **self.PROCESS_GROUP
+            )
+        else:
+            transport, protocol = await loop.subprocess_exec(
+                protocol_factory,
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd,
+                **self.PROCESS_GROUP
+            )
+        process = asyncio.subprocess.Process(transport, protocol, loop)
+        if on_start:
+            on_start(process)
+        
+        readers = [
+            asyncio.ensure_future(self._read_lines(process.stdout, "OUT", on_output)),
+            asyncio.ensure_future(self._read_lines(process.stderr, "ERR", on_output)),
+        ]
+        try:
+            # wait_for가 시간 초과 시 exited를 취소하지 않도록 shield로 감쌈
+            await asyncio.wait_for(asyncio.shield(protocol.exited), timeout)
+            
+            # 남은 출력 읽기 (adb 서버처럼 파이프를 물려받은 자식이 남아 있어도 오래 기다리지 않음)
+            await asyncio.wait(readers, timeout=self.OUTPUT_DRAIN_TIMEOUT)
+            return process.returncode
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # 종료 중에 다시 취소되어도(같은 장치 재실행, 모두 중지) 강제 종료까지 마치도록
+            # 별도 작업으로 실행하고 끝날 때까지 기다림
+            terminating = asyncio.ensure_future(self._terminate(process, protocol.exited))
+            while not terminating.done():
+                with contextlib.suppress(asyncio.CancelledError):
+                    await asyncio.shield(terminating)
+            raise
+        finally:
+            for reader in readers:
+                reader.cancel()
+            transport.close()
+    
+    async def _terminate(self, process, exited: asyncio.Future):
+        """
+        프로세스 그룹 전체에 종료를 요청하고, 유예 시간이 지나면 그룹 전체를 강제 종료합니다.
+        
+        POSIX는 SIGTERM 후 SIGKILL, Windows는 CTRL_BREAK 후 taskkill /T /F를 사용합니다.
+        여러 명령을 취소하면 각 작업이 동시에 이 과정을 거치므로 유예 시간은 한 번만 걸립니다.
+        """
+        if exited.done():
+            return
+        try:
+            if os.name == 'nt':
+                os.kill(process.pid, signal.CTRL_BREAK_EVENT)
+            else:
+                os.killpg(process.pid, signal.SIGTERM)
+        except OSError:
+            # 이미 종료되었거나 그룹에 신호를 보낼 수 없으면 강제 종료 단계에서 처리
+            pass
+        
+        try:
+            await asyncio.wait_for(asyncio.shield(exited), self.TERMINATE_GRACE)
+        except asyncio.TimeoutError:
+            await self._kill_tree(process)
+            await exited
+    
+    async def _kill_tree(self, process):
+        """프로세스 그룹(Windows는 프로세스 트리)을 강제 종료합니다."""
+        if os.name != 'nt':
+            # process.kill()은 신호 전에 자식을 회수(poll)하므로 쓰지 않음 (종료는 exited로 확인)
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(process.pid, signal.SIGKILL)
+            return
+        
+        try:
+            killer = await asyncio.create_subprocess_exec(
+                "taskkill", "/T", "/F", "/PID", str(process.pid),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            await killer.wait()
+        except OSError:
+            pass
+        
+        # taskkill이 없거나 실패했을 때를 대비해 직접 종료 (이미 종료되었으면 무시)
+        with contextlib.suppress(ProcessLookupError):
+            process.kill()
+    
+    async def _read_lines(self, stream, name: str, on_output):
+        """스트림을 한 줄씩 읽어 콜백으로 전달합니다."""
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:
+                # LINE_LIMIT보다 긴 줄은 버퍼에서 버려짐
+                on_output(name, "(너무 긴 줄 생략)")
+                continue
+            if not line:
+                break
+            on_output(name, line.decode('utf-8', errors='replace').rstrip())
+
+
+class AdbError(Exception):
+    """adb 서버가 FAIL을 반환했거나 응답이 프로토콜과 맞지 않을 때 발생"""
+
+
+class AdbUnsupported(Exception):
+    """adb 서버로 직접 처리할 수 없는 요청 (adb 프로세스로 대신 실행)"""
+
+
+class AdbClient:
+    """
+    adb 서버(기본 127.0.0.1:5037)와 호스트 프로토콜로 직접 통신하는 asyncio 클라이언트
+    
+    명령마다 adb 프로세스(와 셸)를 실행하지 않고 서버 소켓에 바로 요청합니다.
+    서버는 서비스 하나가 끝나면 연결을 닫으므로 연결은 요청마다 새로 열고,
+    장치별 기능 목록(shell_v2 지원 여부)은 캐시해 두고 다시 조회하지 않습니다.
+    엔진 이벤트 루프에서만 사용합니다.
+    """
+    
+    # shell v2 패킷 ID
+    SHELL_STDOUT = 1
+    SHELL_STDERR = 2
+    SHELL_EXIT = 3
+    # sync 서비스에서 한 번에 보내는 최대 데이터 크기
+    SYNC_DATA_MAX = 64 * 1024
+    # 한 줄의 최대 길이 (바이트, 넘으면 해당 줄 생략)
+    LINE_LIMIT = 1024 * 1024
+    # shell_v2를 지원하지 않는 장치에서 종료 코드를 받기 위해 명령 뒤에 출력하는 표시
+    EXIT_MARKER = "__ADB_MANAGER_EXIT__"
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = None):
+        self.host = host
+        self.port = port or int(os.environ.get("ANDROID_ADB_SERVER_PORT", 5037))
+        self._features = {}
+    
+    async def _connect(self):
+        return await asyncio.open_connection(self.host, self.port, limit=self.LINE_LIMIT)
+    
+    async def _request(self, reader, writer, request: str):
+        """요청을 보내고 OKAY를 확인합니다 (FAIL이면 AdbError)."""
+        data = request.encode('utf-8')
+        writer.write(b"%04x" % len(data) + data)
+        await writer.drain()
+        
+        status = await reader.readexactly(4)
+        if status == b"FAIL":
+            raise AdbError(await self._read_string(reader))
+        if status != b"OKAY":
+            raise AdbError(f"알 수 없는 응답: {status!r}")
+    
+    async def _read_string(self, reader) -> str:
+        length = int(await reader.readexactly(4), 16)
+        return (await reader.readexactly(length)).decode('utf-8', errors='replace')
+    
+    async def _query(self, request: str) -> str:
+        """호스트 요청을 보내고 길이가 붙은 응답 문자열을 받습니다."""
+        reader, writer = await self._connect()
+        try:
+            await self._request(reader, writer, request)
+            return await self._read_string(reader)
+        finally:
+            writer.close()
+    
+    async def _open_service(self, serial: str, service: str):
+        """장치로 연결을 전환한 뒤 서비스를 엽니다 (연결은 호출한 쪽에서 닫음)."""
+        reader, writer = await self._connect()
+        try:
+            await self._request(reader, writer, f"host:transport:{serial}")
+            await self._request(reader, writer, service)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+    
+    async def devices(self) -> List[str]:
+        """연결된 장치 목록 (`adb devices -l`의 장치 줄과 같은 형식)"""
+        text = await self._query("host:devices-l")
+        return [line.strip() for line in text.splitlines() if line.strip()]
+    
+    async def features(self, serial: str) -> set:
+        """장치가 지원하는 기능 목록 (캐시됨)"""
+        if serial not in self._features:
+            text = await self._query(f"host-serial:{serial}:features")
+            self._features[serial] = set(text.strip().split(","))
+        return self._features[serial]
+    
+    async def track_devices(self, on_change):
+        """
+        장치가 연결/해제되거나 상태가 바뀔 때마다 on_change(장치 줄 목록)를 호출합니다.
+        
+        연결 직후 현재 목록을 한 번 받고, 이후에는 서버가 변경을 알려줄 때만 받습니다 (폴링 없음).
+        서버 연결이 끊기면 asyncio.IncompleteReadError 또는 OSError가 발생합니다.
+        """
+        reader, writer = await self._connect()
+        try:
+            try:
+                await self._request(reader, writer, "host:track-devices-l")
+            except AdbError:
+                # track-devices-l을 지원하지 않는 오래된 서버 (장치 ID와 상태만 받음)
+                writer.close()
+                reader, writer = await self._connect()
+                await self._request(reader, writer, "host:track-devices")
+            
+            while True:
+                text = await self._read_string(reader)
+                on_change([line.strip() for line in text.splitlines() if line.strip()])
+        finally:
+            writer.close()
+    
+    async def open_shell(self, serial: str) -> "ShellSession":
+        """장치에 명령을 계속 보낼 수 있는 셸 세션을 엽니다 (shell v2 필요)."""
+        if "shell_v2" not in await self.features(serial):
+            raise AdbUnsupported(f"shell v2를 지원하지 않는 장치: {serial}")
+        reader, writer = await self._open_service(serial, "shell,v2,raw:")
+        return ShellSession(serial, reader, writer)
+    
+    def forget(self, serial: str):
+        """장치 기능 캐시 삭제 (장치가 재연결되면 adbd가 바뀌었을 수 있음)"""
+        self._features.pop(serial, None)
+    
+    async def shell(self, serial: str, command: str, on_output) -> int:
+        """
+        장치에서 셸 명령을 실행하고 종료 코드를 반환합니다.
+        
+        shell_v2를 지원하는 장치는 stdout/stderr와 종료 코드를 구분해서 받고,
+        지원하지 않는 장치는 기존 shell: 서비스로 실행합니다 (stderr가 stdout에 합쳐짐).
+        
+        Args:
+            serial: 장치 ID
+            command: 장치에서 실행할 명령
+            on_output: 출력 줄 콜백 on_output("OUT" 또는 "ERR", 줄)
+        """
+        if "shell_v2" in await self.features(serial):
+            return await self._shell_v2(serial, command, on_output)
+        return await self._shell_legacy(serial, command, on_output)
+    
+    async def _shell_v2(self, serial: str, command: str, on_output) -> int:
+        reader, writer = await self._open_service(serial, f"shell,v2,raw:{command}")
+        buffers = {self.SHELL_STDOUT: ("OUT", bytearray()), self.SHELL_STDERR: ("ERR", bytearray())}
+        try:
+            while True:
+                try:
+                    packet_id, length = struct.unpack("<BI", await reader.readexactly(5))
+                    data = await reader.readexactly(length)
+                except asyncio.IncompleteReadError:
+                    raise AdbError("종료 코드를 받기 전에 연결이 끊어졌습니다")
+                
+                if packet_id in buffers:
+                    name, buffer = buffers[packet_id]
+                    buffer += data
+                    self._emit_lines(buffer, name, on_output)
+                elif packet_id == self.SHELL_EXIT:
+                    for name, buffer in buffers.values():
+                        self._emit_lines(buffer, name, on_output, final=True)
+                    return data[0] if data else 0
+        finally:
+            writer.close()
+    
+    async def _shell_legacy(self, serial: str, command: str, on_output) -> int:
+        reader, writer = await self._open_service(serial, f"shell:{command}\necho {self.EXIT_MARKER}$?")
+        exit_code = None
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    on_output("OUT", "(너무 긴 줄 생략)")
+                    continue
+                if not line:
+                    break
+                text = line.decode('utf-8', errors='replace').rstrip()
+                code = text[len(self.EXIT_MARKER):] if text.startswith(self.EXIT_MARKER) else ""
+                if code.isdigit():
+                    exit_code = int(code)
+                else:
+                    on_output("OUT", text)
+        finally:
+            writer.close()
+        
+        if exit_code is None:
+            raise AdbError("종료 코드를 받기 전에 연결이 끊어졌습니다")
+        return exit_code
+    
+    @staticmethod
+    def _emit_lines(buffer: bytearray, name: str, on_output, final: bool = False):
+        """버퍼에서 완성된 줄을 꺼내 콜백으로 전달합니다 (final이면 남은 부분까지)."""
+        if final:
+            end = len(buffer)
+            if not end:
+                return
+        else:
+            end = buffer.rfind(b"\n")
+            if end < 0:
+                return
+        data = bytes(buffer[:end])
+        del buffer[:end + 1]
+        for line in data.split(b"\n"):
+            on_output(name, line.decode('utf-8', errors='replace').rstrip())
+    
+    async def _sync_stat(self, reader, writer, path: str):
+        """sync STAT: (mode, size, mtime), 파일이 없으면 mode가 0"""
+        data = path.encode('utf-8')
+        writer.write(b"STAT" + struct.pack("<I", len(data)) + data)
+        await writer.drain()
+        response = await reader.readexactly(16)
+        if response[:4] != b"STAT":
+            raise AdbError(f"알 수 없는 sync 응답: {response[:4]!r}")
+        return struct.unpack("<III", response[4:])
+    
+    async def _sync_quit(self, writer):
+        writer.write(b"QUIT" + struct.pack("<I", 0))
+        await writer.drain()
+    
+    async def pull(self, serial: str, remote: str, local: str) -> int:
+        """
+        장치의 파일 하나를 가져오고 받은 바이트 수를 반환합니다.
+        
+        local이 디렉토리면 그 안에 같은 이름으로 저장합니다.
+        디렉토리를 가져오는 경우는 AdbUnsupported가 발생합니다.
+        """
+        reader, writer = await self._open_service(serial, "sync:")
+        try:
+            mode, size, mtime = await self._sync_stat(reader, writer, remote)
+            if mode == 0:
+                raise AdbError(f"remote object '{remote}' does not exist")
+            if not stat.S_ISREG(mode):
+                raise AdbUnsupported(f"일반 파일이 아님: {remote}")
+            
+            if os.path.isdir(local):
+                local = os.path.join(local, posixpath.basename(remote))
+            
+            data = remote.encode('utf-8')
+            writer.write(b"RECV" + struct.pack("<I", len(data)) + data)
+            await writer.drain()
+            
+            received = 0
+            try:
+                with open(local, 'wb') as f:
+                    while True:
+                        header = await reader.readexactly(8)
+                        length = struct.unpack("<I", header[4:])[0]
+                        if header[:4] == b"DATA":
+                            f.write(await reader.readexactly(length))
+                            received += length
+                        elif header[:4] == b"DONE":
+                            break
+                        elif header[:4] == b"FAIL":
+                            raise AdbError((await reader.readexactly(length)).decode('utf-8', errors='replace'))
+                        else:
+                            raise AdbError(f"알 수 없는 sync 응답: {header[:4]!r}")
+            except BaseException:
+                # 받다 만 파일은 남기지 않음
+                with contextlib.suppress(OSError):
+                    os.remove(local)
+                raise
+            
+            await self._sync_quit(writer)
+            return received
+        finally:
+            writer.close()
+    
+    async def push(self, serial: str, local: str, remote: str) -> int:
+        """
+        로컬 파일 하나를 장치로 보내고 보낸 바이트 수를 반환합니다.
+        
+        remote가 장치의 디렉토리(또는 '/'로 끝남)면 그 안에 같은 이름으로 저장합니다.
+        디렉토리를 보내는 경우는 AdbUnsupported가 발생합니다.
+        """
+        if os.path.isdir(local):
+            raise AdbUnsupported(f"일반 파일이 아님: {local}")
+        file_stat = os.stat(local)
+        
+        reader, writer = await self._open_service(serial, "sync:")
+        try:
+            mode, _, _ = await self._sync_stat(reader, writer, remote)
+            if remote.endswith("/") or stat.S_ISDIR(mode):
+                remote = posixpath.join(remote, os.path.basename(local))
+            
+            # Windows의 st_mode에는 유닉스 권한이 없으므로 adb와 같이 0644 사용
+            file_mode = 0o100644 if os.name == 'nt' else file_stat.st_mode
+            spec = f"{remote},{file_mode}".encode('utf-8')
+            writer.write(b"SEND" + struct.pack("<I", len(spec)) + spec)
+            
+            sent = 0
+            with open(local, 'rb') as f:
+                while True:
+                    chunk = f.read(self.SYNC_DATA_MAX)
+                    if not chunk:
+                        break
+                    writer.write(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+                    await writer.drain()
+                    sent += len(chunk)
+            
+            writer.write(b"DONE" + struct.pack("<I", int(file_stat.st_mtime)))
+            await writer.drain()
+            
+            header = await reader.readexactly(8)
+            length = struct.unpack("<I", header[4:])[0]
+            if header[:4] == b"FAIL":
+                raise AdbError((await reader.readexactly(length)).decode('utf-8', errors='replace'))
+            if header[:4] != b"OKAY":
+                raise AdbError(f"알 수 없는 sync 응답: {header[:4]!r}")
+            
+            await self._sync_quit(writer)
+            return sent
+        finally:
+            writer.close()
+
+
+class ShellSession:
+    """
+    장치 하나에 오래 유지하는 셸 (shell v2)
+    
+    명령마다 셸을 새로 열지 않고 표준 입력으로 명령을 보낸 뒤, 명령 다음에 출력하는
+    고유 표시로 stdout/stderr의 끝과 종료 코드를 구분합니다. 명령은 서브셸에서
+    표준 입력 없이 실행하므로 cd, exit 등이 세션에 영향을 주지 않습니다.
+    같은 세션의 명령은 차례로 실행되며, 실행 중 취소되거나 시간이 초과되면
+    셸 상태를 알 수 없으므로 세션을 닫습니다. 엔진 이벤트 루프에서만 생성/사용합니다.
+    """
+    
+    def __init__(self, serial: str, reader, writer):
+        self.serial = serial
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+        self._lock = asyncio.Lock()
+        # 명령을 실행하지 않을 때도 계속 읽어서 장치 재부팅 등으로 셸이 끝난 것을 바로 알아챔
+        self._packets = asyncio.Queue()
+        # 명령 실행 중에만 출력을 큐에 넣음 (그 외 출력은 어느 명령의 것도 아니므로 버림)
+        self._active = False
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_packets())
+    
+    @property
+    def alive(self) -> bool:
+        """세션을 계속 쓸 수 있는지 여부"""
+        return not self.closed
+    
+    async def _read_packets(self):
+        """셸 패킷을 큐에 넣기 (셸이 끝나거나 연결이 끊기면 None을 넣고 세션 닫기)"""
+        try:
+            while True:
+                packet_id, length = struct.unpack("<BI", await self.reader.readexactly(5))
+                data = await self.reader.readexactly(length)
+                if packet_id == AdbClient.SHELL_EXIT:
+                    break
+                if self._active:
+                    self._packets.put_nowait((packet_id, data))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.closed = True
+            self.writer.close()
+            self._packets.put_nowait((None, b""))
+    
+    async def run(self, command: str, on_output) -> int:
+        """
+        세션에서 명령을 실행하고 종료 코드를 반환합니다.
+        
+        Args:
+            command: 장치에서 실행할 명령
+            on_output: 출력 줄 콜백 on_output("OUT" 또는 "ERR", 줄)
+        """
+        async with self._lock:
+            if not self.alive:
+                raise AdbError("셸 세션이 닫혔습니다")
+            
+            # 이전 명령이 끝난 뒤 들어온 출력(백그라운드 작업, 늦게 온 stderr)은 이 명령의 출력이 아님
+            while not self._packets.empty():
+                self._packets.get_nowait()
+            
+            marker = f"__ADB_MANAGER_{uuid.uuid4().hex}__"
+            script = f"(\n{command}\n) </dev/null\necho {marker}$?\necho {marker} >&2\n".encode('utf-8')
+            self._active = True
+            try:
+                self.writer.write(struct.pack("<BI", 0, len(script)) + script)
+                await self.writer.drain()
+                return await self._read_until(marker.encode('utf-8'), on_output)
+            except BaseException:
+                self.close()
+                raise
+            finally:
+                self._active = False
+    
+    async def _read_until(self, marker: bytes, on_output) -> int:
+        """두 스트림에서 표시가 나올 때까지 출력을 전달하고 stdout 표시 뒤의 종료 코드를 반환합니다."""
+        stdout, stderr = bytearray(), bytearray()
+        exit_code = None
+        stderr_done = False
+        while exit_code is None or not stderr_done:
+            packet_id, data = await self._packets.get()
+            if packet_id is None:
+                raise AdbError("명령 실행 중 셸 세션이 끝났습니다")
+            if packet_id == AdbClient.SHELL_STDOUT:
+                stdout += data
+                exit_code = self._take_marker(stdout, marker, "OUT", on_output)
+            elif packet_id == AdbClient.SHELL_STDERR:
+                stderr += data
+                stderr_done = self._take_marker(stderr, marker, "ERR", on_output) is not None
+        return exit_code
+    
+    @staticmethod
+    def _take_marker(buffer: bytearray, marker: bytes, name: str, on_output) -> Optional[int]:
+        """
+        버퍼의 완성된 줄을 전달하고, 표시 줄이 완성되었으면 표시 앞의 출력을 마저 전달한 뒤
+        표시 뒤의 숫자(없으면 0)를 반환합니다. 표시가 아직 없으면 None을 반환합니다.
+        """
+        idx = buffer.find(marker)
+        if idx < 0 or buffer.find(b"\n", idx) < 0:
+            # 표시가 줄 중간에서 잘렸을 수 있으므로 마지막 줄은 남겨 둠
+            AdbClient._emit_lines(buffer, name, on_output)
+            return None
+        
+        end = buffer.find(b"\n", idx)
+        code = bytes(buffer[idx + len(marker):end]).strip()
+        # 출력이 개행 없이 끝났으면 표시가 같은 줄에 붙어 있음
+        head = buffer[:idx]
+        del buffer[:end + 1]
+        AdbClient._emit_lines(head, name, on_output)
+        AdbClient._emit_lines(head, name, on_output, final=True)
+        return int(code) if code.isdigit() else 0
+    
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._reader_task.cancel()
+            self.writer.close()
+
+
+# 따옴표 안에서도 호스트 셸이 해석할 수 있는 문자
+# (cmd: 환경 변수, 이스케이프 / sh: 변수, 명령 치환, 이스케이프. cmd에서 \는 일반 문자)
+_HOST_SHELL_CHARS = set('%^\n') if os.name == 'nt' else set('`$\\\n')
+# 따옴표 밖에서 호스트 셸이 해석하는 문자 (파이프, 리다이렉션, 명령 구분)
+_HOST_SHELL_OPERATORS = set('|&;<>()')
+
+
+def _split_host_args(text: str) -> Optional[List[str]]:
+    """
+    호스트 셸이 인자를 나누는 방식대로 나눕니다 (따옴표 제거).
+    
+    호스트 셸이 해석하는 문법이 있으면 None을 반환합니다.
+    Windows(cmd)에서는 작은따옴표가 따옴표가 아니므로 그대로 둡니다.
+    """
+    if _HOST_SHELL_CHARS.intersection(text):
+        return None
+    # Windows 프로그램은 \"를 따옴표가 아닌 문자 "로 해석하므로 나누는 결과가 달라짐
+    if os.name == 'nt' and '\\"' in text:
+        return None
+    
+    quotes = '"' if os.name == 'nt' else '"\''
+    args, current, quote, in_arg = [], [], None, False
+    for ch in text:
+        if quote:
+            if ch == quote:
+                quote = None
+            else:
+                current.append(ch)
+        elif ch in quotes:
+            quote = ch
+            in_arg = True
+        elif ch in _HOST_SHELL_OPERATORS:
+            return None
+        elif ch.isspace():
+            if in_arg:
+                args.append("".join(current))
+                current, in_arg = [], False
+        else:
+            current.append(ch)
+            in_arg = True
+    
+    if quote:
+        return None
+    if in_arg:
+        args.append("".join(current))
+    return args
+
+
+@functools.lru_cache(maxsize=256)
+def parse_command_template(template: str) -> Optional[Tuple[str, ...]]:
+    """
+    명령 템플릿을 인자 목록으로 나눕니다 (템플릿마다 한 번만 나누고 결과를 캐시).
+    
+    파이프, 리다이렉션 등 호스트 셸이 해석해야 하는 명령이면 None을 반환합니다 (셸로 실행).
+    변수([ADBID] 등)는 나눈 뒤 인자별로 치환하므로 값에 공백이 있어도 인자가 나뉘지 않습니다.
+    """
+    args = _split_host_args(template)
+    return tuple(args) if args else None
+
+
+def parse_native_adb(argv: List[str]):
+    """
+    adb 서버로 직접 실행할 수 있는 명령이면 (장치 ID, "shell"/"pull"/"push", 인자 목록)을 반환합니다.
+    
+    adb 옵션(-t, -a 등)이 있는 명령은 결과가 달라질 수 있으므로 None을 반환합니다.
+    shell 명령은 adb와 같이 인자를 공백으로 이어 장치에 보냅니다.
+    """
+    if len(argv) < 5 or argv[0] != "adb" or argv[1] != "-s" or argv[3] not in ("shell", "pull", "push"):
+        return None
+    serial, action, args = argv[2], argv[3], argv[4:]
+    if args[0].startswith("-"):
+        return None
+    
+    if action == "shell":
+        return serial, action, [" ".join(args)]
+    if action == "pull" and len(args) in (1, 2):
+        return serial, action, args
+    if action == "push" and len(args) == 2:
+        return serial, action, args
+    return None
+
+
+class PreparedCommand:
+    """
+    변수를 치환한 실행할 명령 하나
+    
+    argv가 있으면 셸 없이 인자 목록으로 실행하고, None이면(호스트 셸 문법이 있는 명령)
+    text를 셸로 실행합니다. 둘 다 cwd에서 실행합니다.
+    """
+    
+    def __init__(self, text: str, argv: Optional[List[str]], cwd: Optional[str]):
+        self.text = text
+        self.argv = argv
+        self.cwd = cwd
+    
+    def program_args(self) -> List[str]:
+        """
+        실행할 인자 목록
+        
+        Windows에서 "cd /d <경로> && adb ..."가 <경로>의 adb를 먼저 실행하던 것과 같이,
+        프로그램 이름만 있으면 cwd에서 먼저 찾고 없으면 PATH에서 찾습니다.
+        """
+        program = self.argv[0]
+        if self.cwd and not os.path.dirname(program):
+            program = shutil.which(program, path=self.cwd) or program
+        return [program] + self.argv[1:]
+    
+    def __str__(self) -> str:
+        return self.text
+
+
+class LogSpill:
+    """
+    로그 창의 최대 줄 수를 넘어 밀려난 오래된 줄을 보관하는 회전 로그 파일
+    
+    <directory>/adb_manager.log에 추가하고, 크기가 max_bytes를 넘으면
+    adb_manager.log.1 ... adb_manager.log.<backups> 순으로 밀어내며 가장 오래된 파일은 삭제합니다.
+    """
+    
+    FILE_NAME = "adb_manager.log"
+    
+    def __init__(self, directory: str = "logs", max_bytes: int = 10 * 1024 * 1024, backups: int = 5):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.error = None
+        self._file = None
+        self._size = 0
+        # UI 스레드의 기록과 검색 스레드의 flush/회전이 겹치지 않도록 보호
+        self._lock = threading.Lock()
+    
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, self.FILE_NAME)
+    
+    def write(self, lines: List[str]):
+        """줄 목록을 파일에 추가합니다 (실패하면 이후 기록하지 않고 error에 예외 저장)."""
+        if self.error is not None:
+            return
+        data = ("\n".join(lines) + "\n").encode('utf-8')
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._file = open(self.path, 'ab')
+                    self._size = self._file.tell()
+                    header = f"=== 세션 시작: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n"
+                    self._file.write(header.encode('utf-8'))
+                
+                self._file.write(data)
+                self._size += len(data)
+                if self._size >= self.max_bytes:
+                    self._rotate()
+            except OSError as e:
+                self.error = e
+    
+    def _rotate(self):
+        """현재 파일을 .1로 옮기고 새 파일 시작 (lock을 잡은 상태에서 호출)"""
+        self._file.close()
+        for idx in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{idx}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{idx + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, 'wb')
+        self._size = 0
+    
+    def files(self) -> List[str]:
+        """보관 중인 파일 목록 (오래된 것부터)"""
+        paths = [f"{self.path}.{idx}" for idx in range(self.backups, 0, -1)] + [self.path]
+        return [path for path in paths if os.path.exists(path)]
+    
+    def search(self, text: str, limit: int) -> List[str]:
+        """보관 파일에서 text를 포함하는 줄을 찾습니다 (대소문자 무시, 오래된 줄부터 최대 limit개)."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            paths = self.files()
+        
+        needle = text.casefold()
+        results = []
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    for line in f:
+                        if needle in line.casefold():
+                            results.append(line.rstrip("\n"))
+                            if len(results) >= limit:
+                                return results
+            except OSError:
+                continue
+        return results
+    
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class RunCapture:
+    """
+    실행(버튼 클릭) 하나의 출력을 <directory>/<CURTIME>/ 아래에 장치별, 명령별 JSON Lines 파일로 저장합니다.
+    
+    명령을 실행할 때마다 open()으로 파일을 만들고, 명령이 끝나면
+    <directory>/index.jsonl에 실행 ID, 장치, 명령, 파일, 종료 코드를 한 줄씩 추가합니다.
+    엔진 이벤트 루프 스레드에서만 사용합니다.
+    """
+    
+    INDEX_FILE = "index.jsonl"
+    
+    def __init__(self, directory: str, run_id: str, command_name: str):
+        """
+        Args:
+            directory: 저장 디렉토리 (설정의 capture_dir)
+            run_id: 실행 ID ([CURTIME] 값, 하위 디렉토리 이름으로 사용)
+            command_name: 버튼 이름 (파일 이름에 사용)
+        """
+        self.directory = directory
+        self.run_id = run_id
+        self.command_name = command_name
+        self.run_dir = os.path.join(directory, run_id)
+    
+    def open(self, device_ids: List[str], cmd: str) -> "CommandCapture":
+        """명령 하나의 출력 파일 생성 (그룹 명령이면 그룹 전체가 파일 하나)"""
+        name = re.sub(r'[^\w.,-]+', '_', f"{','.join(device_ids)}__{self.command_name}")[:150]
+        os.makedirs(self.run_dir, exist_ok=True)
+        return CommandCapture(self, os.path.join(self.run_dir, f"{name}.jsonl"), device_ids, cmd)
+    
+    def add_index(self, record: dict):
+        """실행 색인에 명령 결과 추가"""
+        with open(os.path.join(self.directory, self.INDEX_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class CommandCapture:
+    """명령 하나의 시작/출력/종료 기록을 JSON Lines 파일에 버퍼링하여 씁니다."""
+    
+    def __init__(self, run: RunCapture, path: str, device_ids: List[str], cmd: str):
+        self.run = run
+        self.path = path
+        self.device_id = ",".join(device_ids)
+        self.device_ids = device_ids
+        self.cmd = cmd
+        self.started = time.time()
+        # 같은 초에 같은 명령을 다시 실행하면 같은 파일에 이어서 기록 (start 기록으로 구분)
+        self._file = open(path, 'a', encoding='utf-8', buffering=64 * 1024)
+        self._write({"event": "start", "command": cmd, "name": run.command_name})
+    
+    def _write(self, record: dict):
+        record = {"ts": datetime.now().isoformat(timespec='milliseconds'), "device_id": self.device_id, **record}
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    
+    def write(self, stream: str, line: str):
+        """출력 한 줄 기록 (stream: "OUT" 또는 "ERR")"""
+        self._write({"stream": stream, "line": line})
+    
+    def close(self, status: str, exit_code: Optional[int]):
+        """
+        종료 기록을 쓰고 파일을 닫은 뒤 실행 색인에 추가합니다.
+        
+        Args:
+            status: "completed", "failed", "cancelled", "timeout", "error" 중 하나
+            exit_code: 프로세스 종료 코드 (종료 코드가 없으면 None)
+        """
+        duration = round(time.time() - self.started, 3)
+        self._write({"event": "exit", "status": status, "exit_code": exit_code, "duration": duration})
+        self._file.close()
+        self.run.add_index({
+            "run": self.run.run_id,
+            "name": self.run.command_name,
+            "command": self.cmd,
+            "device_ids": self.device_ids,
+            "file": os.path.relpath(self.path, self.run.directory),
+            "status": status,
+            "exit_code": exit_code,
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            "duration": duration,
+        })
+
+
+class ConcurrencyLimiter:
+    """
+    동시에 실행하는 명령 수를 제한합니다 (엔진 이벤트 루프에서만 사용).
+    
+    전체 제한(max_parallel)과 키별 제한(USB 허브, 장치 그룹)을 함께 적용합니다.
+    키별 슬롯을 먼저 얻고 전체 슬롯을 마지막에 얻으므로, 허브가 꽉 찬 명령이
+    전체 슬롯을 차지한 채 기다리지 않습니다. 슬롯은 항상 같은 순서로 얻으므로 교착되지 않습니다.
+    """
+    
+    def __init__(self, on_change=None):
+        """
+        Args:
+            on_change: 대기/실행 수가 바뀔 때 호출되는 콜백 (이벤트 루프 스레드에서 호출됨)
+        """
+        self.max_parallel = 0
+        self.queued = 0
+        self.running = 0
+        self.on_change = on_change
+        self._semaphores = {}
+    
+    def configure(self, max_parallel: int):
+        """전체 동시 실행 수 설정 (0이면 제한 없음, 이후 시작하는 명령부터 적용)"""
+        self.max_parallel = max(0, max_parallel)
+        self._semaphores = {}
+    
+    def _semaphore(self, key, limit: int) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(limit)
+        return semaphore
+    
+    @contextlib.asynccontextmanager
+    async def slot(self, limits: Dict[str, int]):
+        """
+        실행 슬롯을 얻을 때까지 대기합니다.
+        
+        Args:
+            limits: 키별 동시 실행 제한 (예: {"hub:1-1": 4, "group:rack_a": 2})
+        """
+        needed = [(key, limits[key]) for key in sorted(limits) if limits[key] > 0]
+        if self.max_parallel > 0:
+            needed.append(("", self.max_parallel))
+        
+        acquired = []
+        self.queued += 1
+        self._notify()
+        try:
+            for key, limit in needed:
+                semaphore = self._semaphore(key, limit)
+                await semaphore.acquire()
+                acquired.append(semaphore)
+        except BaseException:
+            # 대기 중 취소됨
+            for semaphore in acquired:
+                semaphore.release()
+            self.queued -= 1
+            self._notify()
+            raise
+        
+        self.queued -= 1
+        self.running += 1
+        self._notify()
+        try:
+            yield
+        finally:
+            for semaphore in acquired:
+                semaphore.release()
+            self.running -= 1
+            self._notify()
+    
+    def _notify(self):
+        if self.on_change:
+            self.on_change(self.queued, self.running)
+
+
 class ADBManager:
     def __init__(self, root):
         self.root = root
@@ -23,27 +1006,61 @@ class ADBManager:
         # ADB 경로 사용 여부
         self.use_custom_adb_path = tk.BooleanVar(value=False)
         
+        # 명령 실행 엔진 (모든 명령의 프로세스와 출력을 하나의 이벤트 루프에서 처리)
+        self.engine = CommandEngine()
+        
+        # adb 서버 직접 연결 (settings의 native_adb, adb_server_port)
+        self.native_adb = True
+        self.adb = AdbClient()
+        
+        # 장치별 유지 셸 세션 (device_id -> ShellSession, 엔진 이벤트 루프에서만 사용)
+        self.shell_sessions = {}
+        
         # 장치별 실행 중인 프로세스 관리 (device_id -> process)
         self.running_processes = {}
         
-        # 장치별 실행 중인 스레드 관리 (device_id -> thread)
-        self.running_threads = {}
+        # 장치별 실행 중인 작업 관리 (device_id -> asyncio.Task, 실행 슬롯 대기 중인 작업 포함)
+        self.running_tasks = {}
         
-        # 장치별 취소 플래그 (device_id -> threading.Event)
-        self.cancel_flags = {}
+        # 동시 실행 제한 (settings의 max_parallel, max_parallel_per_hub, device_groups)
+        self.limiter = ConcurrencyLimiter(on_change=self._on_queue_change)
+        self.max_parallel_per_hub = 0
+        self.device_groups = {}
+        
+        # 장치별 출력 저장 (settings의 capture_output, capture_dir)
+        self.capture_output = True
+        self.capture_dir = "runs"
         
         # 버튼 히스토리 (최대 5개까지 색상 유지)
         self.button_history = []
         self.button_colors = ['#90EE90', '#A8F5A8', '#C0FFC0', '#D8FFD8', '#F0FFF0']  # 초록색 그라데이션
         
+        # 로그 대기열 (여러 스레드에서 추가하고 UI 스레드가 주기적으로 한꺼번에 표시)
+        self.log_queue = queue.Queue(maxsize=LOG_QUEUE_MAX)
+        self.log_dropped = 0
+        self._log_dropped_lock = threading.Lock()
+        self._log_tags = set()
+        
+        # 로그 창에 표시 중인 줄 (최대 log_max_lines줄, 넘으면 오래된 줄부터 파일로 옮김)
+        self.log_lines = collections.deque()
+        self.log_max_lines = 10000
+        self.log_spill = LogSpill()
+        
         # UI 구성
         self.setup_ui()
         
+        # 로그 표시 타이머 시작
+        self.root.after(LOG_FLUSH_INTERVAL_MS, self._flush_log)
+        
+        # JSON 설정 로드 (윈도우 크기 포함, 장치 조회 방식 native_adb/adb_server_port도 여기서 정해짐)
+        self.load_commands()
+        
         # 초기 장치 목록 로드
         self.refresh_devices()
         
-        # JSON 설정 로드 (윈도우 크기 포함)
-        self.load_commands()
+        # 장치 연결/해제 자동 추적 (adb 서버에 직접 연결할 때만)
+        if self.native_adb:
+            self.engine.submit(self._track_devices())
     
     def setup_ui(self):
         # 상단 프레임 (장치 선택)
@@ -58,6 +1075,10 @@ class ADBManager:
         refresh_btn = ttk.Button(top_frame, text="새로고침", command=self.refresh_devices)
         refresh_btn.pack(side=tk.LEFT, padx=5)
         
+        # 실행 슬롯 대기/실행 중인 명령 수
+        self.queue_label = ttk.Label(top_frame, text="대기 0 / 실행 0", width=20)
+        self.queue_label.pack(side=tk.LEFT, padx=5)
+        
         # ADB 경로 설정 프레임
         adb_path_frame = ttk.Frame(self.root, padding="5 0 10 5")
         adb_path_frame.pack(fill=tk.X)
@@ -158,7 +1179,17 @@ class ADBManager:
         bottom_frame = ttk.Frame(self.root, padding="10")
         bottom_frame.pack(fill=tk.BOTH, expand=True)
         
-        ttk.Label(bottom_frame, text="실행 결과:").pack(anchor=tk.W)
+        log_header = ttk.Frame(bottom_frame)
+        log_header.pack(fill=tk.X)
+        
+        ttk.Label(log_header, text="실행 결과:").pack(side=tk.LEFT)
+        
+        # 로그 검색 (창에서 밀려나 파일에 보관된 기록 포함)
+        search_btn = ttk.Button(log_header, text="기록 검색", command=self.search_log)
+        search_btn.pack(side=tk.RIGHT, padx=5)
+        self.log_search_entry = ttk.Entry(log_header, width=30)
+        self.log_search_entry.pack(side=tk.RIGHT, padx=5)
+        self.log_search_entry.bind("<Return>", lambda e: self.search_log())
         
         self.log_text = scrolledtext.ScrolledText(bottom_frame, height=10, wrap=tk.WORD)
         self.log_text.pack(fill=tk.BOTH, expand=True)
@@ -182,61 +1213,154 @@ class ADBManager:
             self.adb_path_entry.delete(0, tk.END)
             self.adb_path_entry.insert(0, directory)
     
-    def get_adb_command(self, base_command: str) -> str:
-        """ADB 명령어에 경로를 적용합니다."""
+    def prepare_command(self, command_template: str, values: Dict[str, str], command_dir: str) -> PreparedCommand:
+        """
+        명령 템플릿의 변수를 치환해 command_dir에서 실행할 명령을 만듭니다.
+        
+        Args:
+            command_template: adb_commands.json의 명령 템플릿
+            values: 변수 이름과 값 (예: {"[ADBID]": "emulator-5554"}, 순서대로 치환)
+            command_dir: 명령 실행 디렉토리 (빈 문자열이면 현재 디렉토리)
+        """
+        def substitute(text: str) -> str:
+            for name, value in values.items():
+                text = text.replace(name, value)
+            return text
+        
+        args = parse_command_template(command_template)
+        argv = [substitute(arg) for arg in args] if args is not None else None
+        return PreparedCommand(substitute(command_template), argv, command_dir or None)
+    
+    def get_command_dir(self) -> str:
+        """명령을 실행할 디렉토리 (사용자 지정 경로 또는 현재 Python 코드 경로, 지정 경로가 비어 있으면 빈 문자열)"""
         if self.use_custom_adb_path.get():
             # 사용자 지정 경로 사용
-            custom_path = self.adb_path_entry.get().strip()
-            if custom_path:
-                return f'cd /d "{custom_path}" && {base_command}'
-        else:
-            # 현재 Python 코드 경로 사용
-            current_path = os.getcwd()
-            return f'cd /d "{current_path}" && {base_command}'
-        
-        return base_command
+            return self.adb_path_entry.get().strip()
+        # 현재 Python 코드 경로 사용
+        return os.getcwd()
     
     def refresh_devices(self):
-        """ADB 장치 목록을 새로고침합니다."""
+        """ADB 장치 목록을 새로고침합니다 (조회는 엔진 이벤트 루프에서 하므로 UI를 멈추지 않음)."""
+        self.engine.submit(self._refresh_devices())
+    
+    async def _refresh_devices(self):
+        """장치 목록을 조회하고 결과를 UI 스레드에서 반영합니다 (엔진 이벤트 루프에서 실행)."""
+        def show_error(message: str):
+            self.root.after(0, lambda: messagebox.showerror("오류", message))
+        
         try:
-            result = subprocess.run(
-                ["adb", "devices", "-l"],
-                capture_output=True,
-                text=True,
-                encoding='utf-8'
-            )
-            
-            if result.returncode != 0:
-                messagebox.showerror("오류", "ADB 명령 실행 실패")
-                return
-            
-            # 장치 목록 파싱
-            self.devices = []
-            lines = result.stdout.strip().split('\n')[1:]  # 첫 줄("List of devices attached") 제외
-            
-            for line in lines:
-                line = line.strip()
-                if line and not line.startswith('*'):
-                    # 장치 ID 추출 (첫 번째 공백 전까지)
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        self.devices.append(line)
-            
-            # 콤보박스 업데이트
-            device_list = ["All Devices"] + self.devices
-            self.device_combo['values'] = device_list
-            
-            if device_list:
-                self.device_combo.current(0)
-            
-            self.log(f"장치 {len(self.devices)}개 발견")
+            # adb 서버에 직접 요청 (서버가 실행 중이 아니면 adb 프로세스로 조회하면서 서버 시작)
+            lines = None
+            if self.native_adb:
+                try:
+                    lines = await asyncio.wait_for(self.adb.devices(), 5)
+                except (OSError, AdbError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    lines = None
             
+            if lines is None:
+                output = []
+                returncode = await self.engine.run(
+                    ["adb", "devices", "-l"],
+                    lambda stream, line: output.append(line) if stream == "OUT" else None,
+                    timeout=COMMAND_TIMEOUT
+                )
+                
+                if returncode != 0:
+                    show_error("ADB 명령 실행 실패")
+                    return
+                
+                # 첫 줄("List of devices attached") 제외
+                lines = [line for line in output if not line.startswith("List of devices")]
+        
         except FileNotFoundError:
-            messagebox.showerror("오류", "ADB를 찾을 수 없습니다. ADB가 설치되어 있고 PATH에 등록되어 있는지 확인하세요.")
+            show_error("ADB를 찾을 수 없습니다. ADB가 설치되어 있고 PATH에 등록되어 있는지 확인하세요.")
+            return
+        except asyncio.TimeoutError:
+            show_error("장치 목록 로드 실패: adb devices 응답 시간 초과")
+            return
         except Exception as e:
-            messagebox.showerror("오류", f"장치 목록 로드 실패: {str(e)}")
+            show_error(f"장치 목록 로드 실패: {str(e)}")
+            return
+        
+        def apply():
+            self._apply_tracked_devices(lines, announce=False)
+            self.log(f"장치 {len(self.devices)}개 발견")
+        
+        self.root.after(0, apply)
+    
+    def _parse_device_lines(self, lines: List[str]) -> List[str]:
+        """장치 목록 출력에서 장치 줄만 골라냅니다 ("* daemon started" 같은 줄 제외)."""
+        devices = []
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith('*'):
+                # 장치 ID 추출 (첫 번째 공백 전까지)
+                parts = line.split()
+                if len(parts) >= 2:
+                    devices.append(line)
+        return devices
     
-    def on_button_click(self, button, command_template):
+    async def _track_devices(self):
+        """adb 서버의 장치 연결/해제 알림을 받아 장치 목록을 갱신합니다 (엔진 이벤트 루프에서 계속 실행)."""
+        delay = 1
+        connected = False
+        
+        def on_change(lines):
+            nonlocal delay, connected
+            delay = 1
+            if not connected:
+                connected = True
+                self.log("장치 자동 추적 시작")
+            self.root.after(0, lambda: self._apply_tracked_devices(lines))
+        
+        while True:
+            try:
+                await self.adb.track_devices(on_change)
+            except (OSError, AdbError, asyncio.IncompleteReadError):
+                pass
+            
+            # adb 서버가 종료되었거나 아직 시작되지 않음: 점점 간격을 늘려 다시 연결
+            if connected:
+                connected = False
+                self.log("장치 자동 추적 연결 끊김 (adb 서버에 다시 연결 시도 중)", "red")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10)
+    
+    def _apply_tracked_devices(self, lines: List[str], announce: bool = True):
+        """
+        장치 추적/새로고침 결과를 장치 목록과 콤보박스에 반영합니다 (UI 스레드에서 실행).
+        
+        announce가 False면 장치별 연결/해제 로그를 남기지 않습니다 (새로고침은 장치 수만 표시).
+        """
+        devices = self._parse_device_lines(lines)
+        if devices == self.devices:
+            return
+        
+        old = {self.extract_device_id(device): device for device in self.devices}
+        new = {self.extract_device_id(device): device for device in devices}
+        if announce:
+            for device_id, device in new.items():
+                if device_id not in old:
+                    self.log(f"[{device_id}] 장치 연결됨")
+                elif device.split()[1] != old[device_id].split()[1]:
+                    self.log(f"[{device_id}] 장치 상태: {device.split()[1]}")
+        for device_id in old.keys() - new.keys():
+            if announce:
+                self.log(f"[{device_id}] 장치 연결 끊김", "red")
+            # 다시 연결되면 adbd가 바뀌었을 수 있으므로 기능 목록을 다시 조회
+            self.engine.loop.call_soon_threadsafe(self.adb.forget, device_id)
+            self.engine.loop.call_soon_threadsafe(self._close_shell_session, device_id)
+        
+        # 선택을 유지한 채 콤보박스 갱신 (선택한 장치가 사라지면 All Devices 선택)
+        selected_id = self.extract_device_id(self.device_combo.get())
+        self.devices = devices
+        self.device_combo['values'] = ["All Devices"] + devices
+        if selected_id in new:
+            self.device_combo.set(new[selected_id])
+        else:
+            self.device_combo.current(0)
+    
+    def on_button_click(self, button, command_template, persistent: bool = False):
         """버튼 클릭 시 호출되는 핸들러"""
         # 버튼 히스토리 업데이트
         if button in self.button_history:
@@ -252,7 +1376,7 @@ class ADBManager:
         self.update_button_colors()
         
         # 명령 실행
-        self.execute_command(command_template)
+        self.execute_command(command_template, button.cget("text"), persistent)
     
     def update_button_colors(self):
         """버튼 히스토리에 따라 색상 업데이트"""
@@ -278,7 +1402,17 @@ class ADBManager:
                     "adb_path": "",
                     "use_custom_adb_path": False,
                     "testtime": 5,
-                    "pair_count": 2
+                    "pair_count": 2,
+                    "max_parallel": 0,
+                    "max_parallel_per_hub": 0,
+                    "device_groups": {},
+                    "log_max_lines": 10000,
+                    "log_dir": "logs",
+                    "log_file_max_mb": 10,
+                    "log_file_backups": 5,
+                    "capture_output": True,
+                    "capture_dir": "runs",
+                    "native_adb": True
                 },
                 "window": {
                     "width": 1000,
@@ -355,7 +1489,32 @@ class ADBManager:
                 self.pair_count_entry.delete(0, tk.END)
                 self.pair_count_entry.insert(0, str(pair_count))
                 
+                # 동시 실행 제한 (0이면 제한 없음)
+                max_parallel = int(settings.get('max_parallel', 0))
+                self.limiter.configure(max_parallel)
+                self.max_parallel_per_hub = int(settings.get('max_parallel_per_hub', 0))
+                self.device_groups = settings.get('device_groups', {})
+                self._on_queue_change(0, 0)
+                
+                # 로그 창 최대 줄 수와 밀려난 줄을 보관할 파일
+                self.log_max_lines = max(100, int(settings.get('log_max_lines', self.log_max_lines)))
+                self.log_spill.directory = settings.get('log_dir', self.log_spill.directory)
+                self.log_spill.max_bytes = int(settings.get('log_file_max_mb', 10)) * 1024 * 1024
+                self.log_spill.backups = int(settings.get('log_file_backups', self.log_spill.backups))
+                
+                # adb 서버 직접 연결
+                self.native_adb = bool(settings.get('native_adb', self.native_adb))
+                if settings.get('adb_server_port'):
+                    self.adb = AdbClient(port=int(settings['adb_server_port']))
+                
+                # 장치별 출력 파일 저장
+                self.capture_output = bool(settings.get('capture_output', self.capture_output))
+                self.capture_dir = settings.get('capture_dir', self.capture_dir)
+                
                 self.log(f"설정 로드: ADB경로={adb_path if use_custom else '현재경로'}, TESTTIME={testtime}, 짝지을보드={pair_count}")
+                if max_parallel or self.max_parallel_per_hub or self.device_groups:
+                    self.log(f"동시 실행 제한: 전체={max_parallel or '없음'}, 허브별={self.max_parallel_per_hub or '없음'}, "
+                             f"장치 그룹 {len(self.device_groups)}개")
             
             # 윈도우 크기 설정 (설정이 있으면 적용)
             if 'window' in config:
@@ -385,27 +1544,29 @@ class ADBManager:
                 for cmd_idx, cmd_info in enumerate(commands):
                     name = cmd_info.get('name', f'명령 {cmd_idx+1}')
                     command = cmd_info.get('command', '')
+                    # 유지 셸 세션으로 실행 (adb -s [ADBID] shell 명령만 해당)
+                    persistent = bool(cmd_info.get('persistent', False))
                     
                     btn = tk.Button(
                         col_frame,
                         text=name,
-                        command=lambda c=command, b=None: self.on_button_click(b, c),
+                        command=lambda c=command, b=None, p=persistent: self.on_button_click(b, c, p),
                         relief=tk.RAISED,
                         borderwidth=2,
                         padx=10,
                         pady=5
                     )
                     # 버튼에 자기 자신을 참조하도록 설정
-                    btn.config(command=lambda c=command, b=btn: self.on_button_click(b, c))
+                    btn.config(command=lambda c=command, b=btn, p=persistent: self.on_button_click(b, c, p))
                     btn.pack(fill=tk.X, pady=2)
             
             total_commands = sum(len(col.get('commands', [])) for col in columns)
             self.log(f"{len(columns)}개 열, {total_commands}개 명령 로드 완료")
-            
+        
         except Exception as e:
             messagebox.showerror("오류", f"설정 파일 로드 실패: {str(e)}")
     
-    def execute_command(self, command_template: str):
+    def execute_command(self, command_template: str, command_name: str = "", persistent: bool = False):
         """명령어를 실행합니다 (별도 스레드에서 실행하여 UI blocking 방지)."""
         selected = self.device_combo.get()
         
@@ -450,71 +1611,109 @@ class ADBManager:
         
         # 각 장치에 대해 이전 실행 중인 명령 취소
         for device_id in devices_to_run:
-            if device_id in self.running_processes:
+            if device_id in self.running_tasks:
                 # 이전 프로세스 종료
                 self.cancel_device_command(device_id)
         
         # 별도 스레드에서 명령 실행
         thread = threading.Thread(
             target=self._execute_command_thread,
-            args=(command_template, selected, time_seconds, current_time, pair_count),
+            args=(command_template, selected, time_seconds, current_time, pair_count, command_name, persistent),
             daemon=True
         )
         thread.start()
     
     def cancel_device_command(self, device_id: str):
         """특정 장치의 실행 중인 명령을 취소합니다."""
-        # 취소 플래그 설정
-        if device_id in self.cancel_flags:
-            self.cancel_flags[device_id].set()
-        
-        # 실행 중인 프로세스 종료
-        if device_id in self.running_processes:
-            process = self.running_processes[device_id]
-            try:
-                process.terminate()
-                process.wait(timeout=2)
-            except:
-                try:
-                    process.kill()
-                except:
-                    pass
-            
+        # 이벤트 루프에서 작업을 취소하면 작업이 프로세스를 종료하고 결과를 기록함 (UI 스레드는 기다리지 않음)
+        task = self.running_tasks.get(device_id)
+        if task is not None:
+            self.engine.cancel(task)
             self.log(f"[{device_id}] 이전 명령 취소됨", "red")
-            del self.running_processes[device_id]
-        
-        # 스레드 정보 제거
-        if device_id in self.running_threads:
-            del self.running_threads[device_id]
     
     def stop_all_commands(self):
-        """실행 중인 모든 명령을 중지합니다."""
-        if not self.running_processes:
+        """실행 중인 모든 명령을 중지합니다 (UI 스레드는 프로세스 종료를 기다리지 않음)."""
+        if not self.running_tasks:
             messagebox.showinfo("알림", "실행 중인 명령이 없습니다.")
             return
         
-        # 모든 장치의 명령 취소
-        device_ids = list(self.running_processes.keys())
-        for device_id in device_ids:
-            self.cancel_device_command(device_id)
-        
-        self.log("\n=== 모든 명령 중지됨 ===", "red")
+        # 모든 작업 취소는 엔진 이벤트 루프에서 한꺼번에 처리하고, 끝나면 로그와 Stop 버튼으로 알림
+        self.log("\n=== 모든 명령 중지 중... ===", "red")
+        self.engine.submit(self._stop_all())
         
-        # Stop 버튼 비활성화
+        # Stop 버튼 비활성화 (중지가 끝나면 상태 다시 갱신)
         self.stop_btn.config(state="disabled")
     
+    async def _stop_all(self):
+        """실행 중인 작업을 모두 취소하고 정리될 때까지 기다립니다 (엔진 이벤트 루프에서 실행)."""
+        tasks = set(self.running_tasks.values())
+        if not tasks:
+            return
+        
+        started = time.time()
+        for task in tasks:
+            task.cancel()
+        # 각 작업이 자기 프로세스 그룹을 동시에 종료함 (유예 시간 후 강제 종료)
+        await asyncio.wait(tasks)
+        
+        self.log(f"\n=== 모든 명령 중지됨 ({len(tasks)}개, {time.time() - started:.1f}초) ===", "red")
+        self.root.after(0, self.update_stop_button_state)
+    
+    def _on_queue_change(self, queued: int, running: int):
+        """대기/실행 중인 명령 수 표시를 갱신합니다 (스레드 안전)."""
+        limit = f"/{self.limiter.max_parallel}" if self.limiter.max_parallel else ""
+        text = f"대기 {queued} / 실행 {running}{limit}"
+        self.root.after(0, lambda: self.queue_label.config(text=text))
+    
+    def _device_usb_path(self, device_id: str) -> str:
+        """`adb devices -l` 결과에서 장치의 USB 경로(예: "1-1.2")를 찾습니다 (없으면 빈 문자열)."""
+        for device in self.devices:
+            parts = device.split()
+            if parts and parts[0] == device_id:
+                for part in parts[2:]:
+                    if part.startswith("usb:"):
+                        return part[4:]
+        return ""
+    
+    def _concurrency_limits(self, device_ids: List[str]) -> Dict[str, int]:
+        """명령 대상 장치에 적용할 키별 동시 실행 제한 (USB 허브별, 장치 그룹별)"""
+        limits = {}
+        for device_id in device_ids:
+            usb_path = self._device_usb_path(device_id)
+            
+            # 같은 허브의 포트는 마지막 포트 번호만 다름 (예: 1-1.2, 1-1.3 -> 허브 1-1)
+            if self.max_parallel_per_hub > 0 and usb_path:
+                hub = re.split(r'[.-](?=[^.-]*$)', usb_path)[0]
+                limits[f"hub:{hub}"] = self.max_parallel_per_hub
+            
+            # 장치 그룹: 시리얼 또는 "usb:" 경로 접두어로 지정
+            for name, group in self.device_groups.items():
+                for pattern in group.get('devices', []):
+                    if pattern == device_id or (pattern.startswith("usb:") and usb_path
+                                                and f"usb:{usb_path}".startswith(pattern)):
+                        limits[f"group:{name}"] = int(group.get('max_parallel', 0))
+                        break
+        return limits
+    
     def update_stop_button_state(self):
         """Stop 버튼의 활성화 상태를 업데이트합니다."""
-        if self.running_processes:
+        if self.running_tasks:
             self.stop_btn.config(state="normal")
         else:
             self.stop_btn.config(state="disabled")
     
-    def _execute_command_thread(self, command_template: str, selected: str, time_value: str, current_time: str, pair_count: int):
+    def _execute_command_thread(self, command_template: str, selected: str, time_value: str, current_time: str,
+                                pair_count: int, command_name: str = "", persistent: bool = False):
         """별도 스레드에서 명령을 실행합니다."""
         # Stop 버튼 활성화
         self.root.after(0, lambda: self.stop_btn.config(state="normal"))
         
+        # 장치별 출력 저장 (실행 ID는 [CURTIME] 값)
+        capture = RunCapture(self.capture_dir, current_time, command_name or "command") if self.capture_output else None
+        
+        # 명령 실행 디렉토리 (ADB 경로)
+        command_dir = self.get_command_dir()
+        
         # [ADBIDS] 명령어 처리
         if "[ADBIDS]" in command_template:
             # All Devices 모드에서만 실행 (이미 검증됨)
@@ -532,13 +1731,11 @@ class ADBManager:
                     adbids_value = ",".join(paired_devices)
                     
                     # 명령어 생성 ([ADBIDS]만 치환, [ADBID]/[ADBNUM]/[TESTTIME]은 사용 안 함)
-                    cmd = (command_template
-                           .replace("[ADBIDS]", adbids_value)
-                           .replace("[TESTTIME]", time_value)
-                           .replace("[CURTIME]", current_time))
-                    
-                    # ADB 경로 적용
-                    cmd = self.get_adb_command(cmd)
+                    cmd = self.prepare_command(command_template, {
+                        "[ADBIDS]": adbids_value,
+                        "[TESTTIME]": time_value,
+                        "[CURTIME]": current_time,
+                    }, command_dir)
                     
                     # 그룹 식별자 생성 (예: "device1,device2")
                     group_id = f"group_{i//pair_count + 1}_{adbids_value}"
@@ -547,10 +1744,10 @@ class ADBManager:
             # 순차/동시 실행
             if self.sequential_var.get():
                 self.log("\n=== 순차 실행 모드 ([ADBIDS]) ===")
-                self._execute_sequential_groups(commands_to_run)
+                self._execute_sequential_groups(commands_to_run, capture)
             else:
                 self.log("\n=== 동시 실행 모드 ([ADBIDS]) ===")
-                self._execute_parallel_groups(commands_to_run)
+                self._execute_parallel_groups(commands_to_run, capture)
         else:
             # 기존 로직 ([ADBID], [ADBNUM] 사용)
             commands_to_run = []
@@ -560,24 +1757,22 @@ class ADBManager:
                 for idx, device in enumerate(self.devices):
                     device_id = self.extract_device_id(device)
                     device_num = str(idx + 1)  # 1부터 시작하는 인덱스
-                    cmd = (command_template
-                           .replace("[ADBID]", device_id)
-                           .replace("[ADBNUM]", device_num)
-                           .replace("[TESTTIME]", time_value)
-                           .replace("[CURTIME]", current_time))
-                    
-                    # ADB 경로 적용
-                    cmd = self.get_adb_command(cmd)
+                    cmd = self.prepare_command(command_template, {
+                        "[ADBID]": device_id,
+                        "[ADBNUM]": device_num,
+                        "[TESTTIME]": time_value,
+                        "[CURTIME]": current_time,
+                    }, command_dir)
                     
                     commands_to_run.append((device_id, cmd))
                 
                 # 순차 실행 여부에 따라 실행 방식 결정
                 if self.sequential_var.get():
                     self.log("\n=== 순차 실행 모드 ===")
-                    self._execute_sequential(commands_to_run)
+                    self._execute_sequential(commands_to_run, capture, persistent)
                 else:
                     self.log("\n=== 동시 실행 모드 ===")
-                    self._execute_parallel(commands_to_run)
+                    self._execute_parallel(commands_to_run, capture, persistent)
             else:
                 # 선택된 장치에 대해서만 실행
                 device_id = self.extract_device_id(selected)
@@ -589,409 +1784,302 @@ class ADBManager:
                         device_num = str(idx + 1)
                         break
                 
-                cmd = (command_template
-                       .replace("[ADBID]", device_id)
-                       .replace("[ADBNUM]", device_num)
-                       .replace("[TESTTIME]", time_value)
-                       .replace("[CURTIME]", current_time))
-                
-                # ADB 경로 적용
-                cmd = self.get_adb_command(cmd)
+                cmd = self.prepare_command(command_template, {
+                    "[ADBID]": device_id,
+                    "[ADBNUM]": device_num,
+                    "[TESTTIME]": time_value,
+                    "[CURTIME]": current_time,
+                }, command_dir)
                 
                 commands_to_run.append((device_id, cmd))
-                self._execute_sequential(commands_to_run)
+                self._execute_sequential(commands_to_run, capture, persistent)
     
-    def _execute_sequential_groups(self, commands_to_run):
+    def _execute_sequential_groups(self, commands_to_run, capture: Optional[RunCapture] = None):
         """[ADBIDS] 그룹 명령을 순차적으로 실행합니다."""
         for group_id, cmd, device_ids in commands_to_run:
             group_label = ','.join(device_ids)
-            self.log(f"\n[그룹: {group_label}] 실행: {cmd}")
-            
-            # 그룹의 모든 장치에 대해 취소 플래그 초기화
-            for device_id in device_ids:
-                self.cancel_flags[device_id] = threading.Event()
-            
-            # 취소 확인
-            cancelled = any(self.cancel_flags[device_id].is_set() for device_id in device_ids)
-            if cancelled:
-                self.log(f"[그룹: {group_label}] 실행 취소됨", "red")
-                continue
-            
-            try:
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    shell=True,
-                    encoding='utf-8',
-                    bufsize=1,  # 라인 버퍼링
-                    universal_newlines=True
-                )
-                
-                # 프로세스 등록 (각 장치별로)
-                for device_id in device_ids:
-                    self.running_processes[device_id] = process
-                
-                # 실시간 출력 읽기
-                def read_output(pipe, prefix):
-                    try:
-                        for line in iter(pipe.readline, ''):
-                            if line:
-                                self.log(f"[그룹: {group_label}] {prefix}: {line.rstrip()}")
-                            # 취소 확인
-                            cancelled = any(self.cancel_flags.get(did) and self.cancel_flags[did].is_set() for did in device_ids)
-                            if cancelled:
-                                break
-                    except Exception as e:
-                        self.log(f"[그룹: {group_label}] 출력 읽기 오류: {str(e)}")
-                    finally:
-                        pipe.close()
-                
-                # stdout, stderr를 별도 스레드로 읽기
-                stdout_thread = threading.Thread(target=read_output, args=(process.stdout, "OUT"), daemon=True)
-                stderr_thread = threading.Thread(target=read_output, args=(process.stderr, "ERR"), daemon=True)
-                
-                stdout_thread.start()
-                stderr_thread.start()
-                
-                # 프로세스 완료 대기 (30초 타임아웃)
-                try:
-                    process.wait(timeout=30)
-                    
-                    # 출력 스레드 완료 대기
-                    stdout_thread.join(timeout=1)
-                    stderr_thread.join(timeout=1)
-                    
-                    # 취소 확인
-                    cancelled = any(self.cancel_flags[device_id].is_set() for device_id in device_ids)
-                    if cancelled:
-                        self.log(f"[그룹: {group_label}] 실행 취소됨", "red")
-                        continue
-                    
-                    if process.returncode == 0:
-                        self.log(f"[그룹: {group_label}] 완료")
-                    else:
-                        self.log(f"[그룹: {group_label}] 종료 코드: {process.returncode}")
-                        
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    self.log(f"[그룹: {group_label}] 타임아웃: 명령 실행 시간 초과")
-                    
-            except Exception as e:
-                self.log(f"[그룹: {group_label}] 실행 실패: {str(e)}")
-            finally:
-                # 프로세스 정리
-                for device_id in device_ids:
-                    if device_id in self.running_processes:
-                        del self.running_processes[device_id]
-                    if device_id in self.cancel_flags:
-                        del self.cancel_flags[device_id]
+            self._wait_jobs([self.engine.submit(self._run_job(f"[그룹: {group_label}]", cmd, device_ids, capture))])
         
         # Stop 버튼 상태 업데이트
         self.root.after(0, self.update_stop_button_state)
     
-    def _execute_parallel_groups(self, commands_to_run):
+    def _execute_parallel_groups(self, commands_to_run, capture: Optional[RunCapture] = None):
         """[ADBIDS] 그룹 명령을 동시에 실행합니다."""
-        threads = []
-        
-        def run_group_command(group_id, cmd, device_ids):
-            group_label = ','.join(device_ids)
-            self.log(f"\n[그룹: {group_label}] 실행: {cmd}")
-            
-            # 그룹의 모든 장치에 대해 취소 플래그 초기화
-            for device_id in device_ids:
-                self.cancel_flags[device_id] = threading.Event()
-            
-            # 취소 확인
-            cancelled = any(self.cancel_flags[device_id].is_set() for device_id in device_ids)
-            if cancelled:
-                self.log(f"[그룹: {group_label}] 실행 취소됨", "red")
-                return
-            
-            try:
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    shell=True,
-                    encoding='utf-8',
-                    bufsize=1,  # 라인 버퍼링
-                    universal_newlines=True
-                )
-                
-                # 프로세스 등록
-                for device_id in device_ids:
-                    self.running_processes[device_id] = process
-                
-                # 실시간 출력 읽기
-                def read_output(pipe, prefix):
-                    try:
-                        for line in iter(pipe.readline, ''):
-                            if line:
-                                self.log(f"[그룹: {group_label}] {prefix}: {line.rstrip()}")
-                            # 취소 확인
-                            cancelled = any(self.cancel_flags.get(did) and self.cancel_flags[did].is_set() for did in device_ids)
-                            if cancelled:
-                                break
-                    except Exception as e:
-                        self.log(f"[그룹: {group_label}] 출력 읽기 오류: {str(e)}")
-                    finally:
-                        pipe.close()
-                
-                # stdout, stderr를 별도 스레드로 읽기
-                stdout_thread = threading.Thread(target=read_output, args=(process.stdout, "OUT"), daemon=True)
-                stderr_thread = threading.Thread(target=read_output, args=(process.stderr, "ERR"), daemon=True)
-                
-                stdout_thread.start()
-                stderr_thread.start()
-                
-                # 프로세스 완료 대기
-                try:
-                    process.wait(timeout=30)
-                    
-                    # 출력 스레드 완료 대기
-                    stdout_thread.join(timeout=1)
-                    stderr_thread.join(timeout=1)
-                    
-                    # 취소 확인
-                    cancelled = any(self.cancel_flags[device_id].is_set() for device_id in device_ids)
-                    if cancelled:
-                        self.log(f"[그룹: {group_label}] 실행 취소됨", "red")
-                        return
-                    
-                    if process.returncode == 0:
-                        self.log(f"[그룹: {group_label}] 완료")
-                    else:
-                        self.log(f"[그룹: {group_label}] 종료 코드: {process.returncode}")
-                        
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    self.log(f"[그룹: {group_label}] 타임아웃: 명령 실행 시간 초과")
-                    
-            except Exception as e:
-                self.log(f"[그룹: {group_label}] 실행 실패: {str(e)}")
-            finally:
-                # 프로세스 정리
-                for device_id in device_ids:
-                    if device_id in self.running_processes:
-                        del self.running_processes[device_id]
-                    if device_id in self.cancel_flags:
-                        del self.cancel_flags[device_id]
-        
-        # 각 그룹에 대해 별도 스레드 생성
+        jobs = []
         for group_id, cmd, device_ids in commands_to_run:
-            thread = threading.Thread(target=run_group_command, args=(group_id, cmd, device_ids), daemon=True)
-            threads.append(thread)
-            thread.start()
+            group_label = ','.join(device_ids)
+            jobs.append(self.engine.submit(self._run_job(f"[그룹: {group_label}]", cmd, device_ids, capture)))
         
-        # 모든 스레드가 완료될 때까지 대기
-        for thread in threads:
-            thread.join()
+        # 모든 그룹이 완료될 때까지 대기
+        self._wait_jobs(jobs)
         
         self.log("\n=== 모든 그룹 실행 완료 ===")
         
         # Stop 버튼 상태 업데이트
         self.root.after(0, self.update_stop_button_state)
     
-    def _execute_sequential(self, commands_to_run):
+    def _execute_sequential(self, commands_to_run, capture: Optional[RunCapture] = None, persistent: bool = False):
         """명령을 순차적으로 실행합니다."""
         for device_id, cmd in commands_to_run:
-            # 취소 플래그 초기화
-            self.cancel_flags[device_id] = threading.Event()
-            
-            # 취소 확인
-            if self.cancel_flags[device_id].is_set():
-                self.log(f"[{device_id}] 실행 취소됨", "red")
-                continue
-            
-            self.log(f"\n[{device_id}] 실행: {cmd}")
-            try:
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    shell=True,
-                    encoding='utf-8',
-                    bufsize=1,  # 라인 버퍼링
-                    universal_newlines=True
-                )
-                
-                # 프로세스 등록
-                self.running_processes[device_id] = process
-                
-                # 실시간 출력 읽기
-                def read_output(pipe, prefix):
-                    try:
-                        for line in iter(pipe.readline, ''):
-                            if line:
-                                self.log(f"[{device_id}] {prefix}: {line.rstrip()}")
-                            # 취소 확인
-                            if self.cancel_flags.get(device_id) and self.cancel_flags[device_id].is_set():
-                                break
-                    except Exception as e:
-                        self.log(f"[{device_id}] 출력 읽기 오류: {str(e)}")
-                    finally:
-                        pipe.close()
-                
-                # stdout, stderr를 별도 스레드로 읽기
-                stdout_thread = threading.Thread(target=read_output, args=(process.stdout, "OUT"), daemon=True)
-                stderr_thread = threading.Thread(target=read_output, args=(process.stderr, "ERR"), daemon=True)
-                
-                stdout_thread.start()
-                stderr_thread.start()
-                
-                # 프로세스 완료 대기 (30초 타임아웃)
-                try:
-                    process.wait(timeout=30)
-                    
-                    # 출력 스레드 완료 대기
-                    stdout_thread.join(timeout=1)
-                    stderr_thread.join(timeout=1)
-                    
-                    # 취소 확인
-                    if self.cancel_flags[device_id].is_set():
-                        self.log(f"[{device_id}] 실행 취소됨", "red")
-                        continue
-                    
-                    if process.returncode == 0:
-                        self.log(f"[{device_id}] 완료")
-                    else:
-                        self.log(f"[{device_id}] 종료 코드: {process.returncode}")
-                        
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    self.log(f"[{device_id}] 타임아웃: 명령 실행 시간 초과")
-                    
-            except Exception as e:
-                self.log(f"[{device_id}] 실행 실패: {str(e)}")
-            finally:
-                # 프로세스 정리
-                if device_id in self.running_processes:
-                    del self.running_processes[device_id]
-                if device_id in self.cancel_flags:
-                    del self.cancel_flags[device_id]
+            self._wait_jobs([self.engine.submit(self._run_job(f"[{device_id}]", cmd, [device_id], capture, persistent))])
         
         # Stop 버튼 상태 업데이트
         self.root.after(0, self.update_stop_button_state)
     
-    def _execute_parallel(self, commands_to_run):
+    def _execute_parallel(self, commands_to_run, capture: Optional[RunCapture] = None, persistent: bool = False):
         """명령을 동시에 실행합니다."""
-        threads = []
+        jobs = [self.engine.submit(self._run_job(f"[{device_id}]", cmd, [device_id], capture, persistent))
+                for device_id, cmd in commands_to_run]
         
-        def run_command(device_id, cmd):
-            # 취소 플래그 초기화
-            self.cancel_flags[device_id] = threading.Event()
-            
-            # 취소 확인
-            if self.cancel_flags[device_id].is_set():
-                self.log(f"[{device_id}] 실행 취소됨", "red")
-                return
-            
-            self.log(f"\n[{device_id}] 실행: {cmd}")
-            try:
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    shell=True,
-                    encoding='utf-8',
-                    bufsize=1,  # 라인 버퍼링
-                    universal_newlines=True
-                )
-                
-                # 프로세스 등록
+        # 모든 장치가 완료될 때까지 대기
+        self._wait_jobs(jobs)
+        
+        self.log("\n=== 모든 장치 실행 완료 ===")
+        
+        # Stop 버튼 상태 업데이트
+        self.root.after(0, self.update_stop_button_state)
+    
+    def _wait_jobs(self, jobs: List[concurrent.futures.Future]):
+        """엔진에 제출한 작업이 모두 끝날 때까지 대기합니다 (실행 스레드에서 호출)."""
+        concurrent.futures.wait(jobs)
+    
+    async def _run_job(self, label: str, cmd: PreparedCommand, device_ids: List[str], capture: Optional[RunCapture] = None,
+                       persistent: bool = False):
+        """
+        명령 하나를 실행하고 출력과 결과를 로그에 기록합니다 (엔진 이벤트 루프에서 실행).
+        
+        Args:
+            label: 로그 접두어 (예: "[emulator-5554]", "[그룹: a,b]")
+            cmd: 실행할 명령 (prepare_command 결과)
+            device_ids: 명령 대상 장치 (그룹 명령이면 여러 개)
+            capture: 출력을 파일로 저장할 실행 (None이면 저장하지 않음)
+            persistent: adb -s X shell 명령을 장치별 유지 셸 세션으로 실행
+        """
+        task = asyncio.current_task()
+        for device_id in device_ids:
+            self.running_tasks[device_id] = task
+        
+        def on_start(process):
+            for device_id in device_ids:
                 self.running_processes[device_id] = process
-                
-                # 실시간 출력 읽기
-                def read_output(pipe, prefix):
+        
+        output = None
+        
+        def on_output(stream, line):
+            self.log(f"{label} {stream}: {line}")
+            if output is not None:
+                output.write(stream, line)
+        
+        status, returncode = "error", None
+        try:
+            # 동시 실행 제한에 걸리면 슬롯이 빌 때까지 대기
+            async with self.limiter.slot(self._concurrency_limits(device_ids)):
+                # adb -s X shell/pull/push 명령은 adb 프로세스 없이 adb 서버에 직접 요청
+                native = parse_native_adb(cmd.argv) if self.native_adb and cmd.argv else None
+                persistent = persistent and bool(native) and native[1] == "shell"
+                route = " (유지 셸)" if persistent else " (adb 서버 직접 연결)" if native else ""
+                self.log(f"\n{label} 실행: {cmd}{route}")
+                if capture is not None:
                     try:
-                        for line in iter(pipe.readline, ''):
-                            if line:
-                                self.log(f"[{device_id}] {prefix}: {line.rstrip()}")
-                            # 취소 확인
-                            if self.cancel_flags.get(device_id) and self.cancel_flags[device_id].is_set():
-                                break
-                    except Exception as e:
-                        self.log(f"[{device_id}] 출력 읽기 오류: {str(e)}")
-                    finally:
-                        pipe.close()
+                        output = capture.open(device_ids, cmd.text)
+                    except OSError as e:
+                        self.log(f"{label} 출력 파일 생성 실패 (파일 저장 없이 실행): {str(e)}", "red")
                 
-                # stdout, stderr를 별도 스레드로 읽기
-                stdout_thread = threading.Thread(target=read_output, args=(process.stdout, "OUT"), daemon=True)
-                stderr_thread = threading.Thread(target=read_output, args=(process.stderr, "ERR"), daemon=True)
+                returncode = None
+                if native:
+                    try:
+                        returncode = await asyncio.wait_for(
+                            self._run_native(native, on_output, cmd.cwd, persistent), COMMAND_TIMEOUT)
+                    except (ConnectionRefusedError, AdbUnsupported) as e:
+                        # adb 서버가 실행 중이 아니거나 직접 처리할 수 없는 요청이면 adb 프로세스로 실행
+                        self.log(f"{label} adb 프로세스로 실행: {str(e)}")
+                        native = None
+                if not native:
+                    # 인자 목록으로 나뉜 명령은 셸 없이 직접 실행 (파이프, 리다이렉션이 있으면 셸로 실행)
+                    returncode = await self.engine.run(cmd.program_args() if cmd.argv else cmd.text, on_output,
+                                                       timeout=COMMAND_TIMEOUT, on_start=on_start, cwd=cmd.cwd)
+            
+            if returncode == 0:
+                status = "completed"
+                self.log(f"{label} 완료")
+            else:
+                status = "failed"
+                self.log(f"{label} 종료 코드: {returncode}")
+        
+        except asyncio.CancelledError:
+            status = "cancelled"
+            self.log(f"{label} 실행 취소됨", "red")
+        except asyncio.TimeoutError:
+            status = "timeout"
+            self.log(f"{label} 타임아웃: 명령 실행 시간 초과")
+        except Exception as e:
+            self.log(f"{label} 실행 실패: {str(e)}")
+        finally:
+            if output is not None:
+                try:
+                    output.close(status, returncode)
+                except OSError as e:
+                    self.log(f"{label} 출력 파일 저장 실패: {str(e)}", "red")
+            
+            # 작업 정리 (같은 장치에서 새 명령이 이미 시작됐으면 그대로 둠)
+            for device_id in device_ids:
+                if self.running_tasks.get(device_id) is task:
+                    del self.running_tasks[device_id]
+                    self.running_processes.pop(device_id, None)
+    
+    async def _run_native(self, native, on_output, command_dir: Optional[str] = None, persistent: bool = False) -> int:
+        """
+        parse_native_adb 결과를 adb 서버에 직접 요청하고 종료 코드를 반환합니다.
+        
+        adb 서버가 FAIL을 반환하면 adb와 같이 "error: ..."를 ERR로 출력하고 1을 반환합니다.
+        pull/push의 상대 경로는 command_dir 기준이며, persistent가 True면 shell 명령을 장치별 유지 셸 세션으로 실행합니다.
+        """
+        serial, action, args = native
+        started = time.time()
+        try:
+            if action == "shell" and persistent:
+                return await self._run_in_shell_session(serial, args[0], on_output)
+            if action == "shell":
+                return await self.adb.shell(serial, args[0], on_output)
+            
+            # 상대 경로는 adb 프로세스와 같이 명령 실행 디렉토리 기준
+            command_dir = command_dir or ""
+            if action == "pull":
+                remote = args[0]
+                local = os.path.join(command_dir, args[1] if len(args) > 1 else ".")
+                size = await self.adb.pull(serial, remote, local)
+            else:
+                local, remote = os.path.join(command_dir, args[0]), args[1]
+                size = await self.adb.push(serial, local, remote)
+            
+            elapsed = time.time() - started
+            on_output("OUT", f"{remote}: 1 file {action}ed. ({size} bytes in {elapsed:.3f}s)")
+            return 0
+        except AdbError as e:
+            on_output("ERR", f"error: {str(e)}")
+            return 1
+    
+    async def _run_in_shell_session(self, serial: str, command: str, on_output) -> int:
+        """장치의 유지 셸 세션에서 명령을 실행합니다 (세션이 없거나 끊겼으면 새로 열기)."""
+        session = self.shell_sessions.get(serial)
+        if session is None or not session.alive:
+            try:
+                session = await self.adb.open_shell(serial)
+            except AdbUnsupported:
+                # shell v2를 지원하지 않는 장치는 명령마다 셸 실행
+                return await self.adb.shell(serial, command, on_output)
+            self.shell_sessions[serial] = session
+        return await session.run(command, on_output)
+    
+    def _close_shell_session(self, serial: str):
+        """장치의 유지 셸 세션 닫기 (장치 연결이 끊겼을 때, 엔진 이벤트 루프에서 호출)"""
+        session = self.shell_sessions.pop(serial, None)
+        if session is not None:
+            session.close()
+    
+    def log(self, message: str, color: str = "black"):
+        """로그 메시지를 대기열에 추가합니다 (스레드 안전, 화면에는 다음 갱신 주기에 표시)."""
+        try:
+            self.log_queue.put_nowait((message, color))
+        except queue.Full:
+            # UI가 따라가지 못할 만큼 출력이 많으면 실행 스레드를 막지 않고 버림
+            with self._log_dropped_lock:
+                self.log_dropped += 1
+    
+    def _flush_log(self):
+        """대기열의 로그를 모아 로그 위젯에 한 번에 추가합니다 (UI 스레드에서 주기적으로 실행)."""
+        try:
+            # 연속된 같은 색상의 줄은 하나로 합쳐 insert 한 번으로 추가
+            chunks = []
+            for _ in range(LOG_FLUSH_MAX_LINES):
+                try:
+                    message, color = self.log_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if chunks and chunks[-1][1] == color:
+                    chunks[-1][0].append(message)
+                else:
+                    chunks.append(([message], color))
+            
+            with self._log_dropped_lock:
+                dropped, self.log_dropped = self.log_dropped, 0
+            if dropped:
+                chunks.append(([f"... 로그가 너무 많아 {dropped}줄을 표시하지 못했습니다"], "red"))
+            
+            if chunks:
+                args = []
+                for messages, color in chunks:
+                    text = "\n".join(messages)
+                    args.append(text + "\n")
+                    args.append(self._log_tag(color))
+                    self.log_lines.extend(text.split("\n"))
+                self.log_text.insert(tk.END, *args)
                 
-                stdout_thread.start()
-                stderr_thread.start()
+                # 최대 줄 수를 넘은 오래된 줄은 파일로 옮기고 위젯에서 삭제
+                excess = len(self.log_lines) - self.log_max_lines
+                if excess > 0:
+                    spilled = [self.log_lines.popleft() for _ in range(excess)]
+                    failed = self.log_spill.error is not None
+                    self.log_spill.write(spilled)
+                    if not failed and self.log_spill.error is not None:
+                        self.log(f"로그 파일 기록 실패 (이후 밀려난 로그는 보관되지 않음): {self.log_spill.error}", "red")
+                    self.log_text.delete("1.0", f"{excess + 1}.0")
                 
-                # 프로세스 완료 대기
-                try:
-                    process.wait(timeout=30)
-                    
-                    # 출력 스레드 완료 대기
-                    stdout_thread.join(timeout=1)
-                    stderr_thread.join(timeout=1)
-                    
-                    # 취소 확인
-                    if self.cancel_flags[device_id].is_set():
-                        self.log(f"[{device_id}] 실행 취소됨", "red")
-                        return
-                    
-                    if process.returncode == 0:
-                        self.log(f"[{device_id}] 완료")
-                    else:
-                        self.log(f"[{device_id}] 종료 코드: {process.returncode}")
-                        
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    self.log(f"[{device_id}] 타임아웃: 명령 실행 시간 초과")
-                    
-            except Exception as e:
-                self.log(f"[{device_id}] 실행 실패: {str(e)}")
-            finally:
-                # 프로세스 정리
-                if device_id in self.running_processes:
-                    del self.running_processes[device_id]
-                if device_id in self.cancel_flags:
-                    del self.cancel_flags[device_id]
-        
-        # 각 장치에 대해 별도 스레드 생성
-        for device_id, cmd in commands_to_run:
-            thread = threading.Thread(target=run_command, args=(device_id, cmd), daemon=True)
-            self.running_threads[device_id] = thread
-            threads.append(thread)
-            thread.start()
+                self.log_text.see(tk.END)
+        finally:
+            self.root.after(LOG_FLUSH_INTERVAL_MS, self._flush_log)
+    
+    def search_log(self):
+        """로그 창과 보관 파일에서 검색어를 포함하는 줄을 찾아 새 창에 표시합니다."""
+        text = self.log_search_entry.get().strip()
+        if not text:
+            messagebox.showwarning("경고", "검색어를 입력하세요.")
+            return
         
-        # 모든 스레드가 완료될 때까지 대기
-        for thread in threads:
-            thread.join()
+        # 로그 창의 줄은 UI 스레드에서 복사하고, 파일 검색은 별도 스레드에서 실행
+        needle = text.casefold()
+        visible = [line for line in self.log_lines if needle in line.casefold()]
         
-        self.log("\n=== 모든 장치 실행 완료 ===")
+        def search():
+            if self.log_spill.error is not None:
+                spilled = []
+            else:
+                spilled = self.log_spill.search(text, LOG_SEARCH_MAX_RESULTS)
+            self.root.after(0, lambda: self._show_search_results(text, spilled, visible))
         
-        # Stop 버튼 상태 업데이트
-        self.root.after(0, self.update_stop_button_state)
+        threading.Thread(target=search, daemon=True).start()
     
-    def log(self, message: str, color: str = "black"):
-        """로그 텍스트 위젯에 메시지를 추가합니다 (스레드 안전)."""
-        def _update_log():
-            # 색상 태그 설정
-            tag_name = f"color_{color}"
+    def _show_search_results(self, text: str, spilled: List[str], visible: List[str]):
+        """검색 결과 창 표시 (보관 파일의 결과가 먼저, 최대 LOG_SEARCH_MAX_RESULTS개씩)"""
+        window = tk.Toplevel(self.root)
+        window.title(f"기록 검색: {text}")
+        window.geometry("900x500")
+        
+        truncated = len(spilled) >= LOG_SEARCH_MAX_RESULTS or len(visible) > LOG_SEARCH_MAX_RESULTS
+        summary = f"보관 파일 {len(spilled)}줄, 로그 창 {len(visible)}줄"
+        if truncated:
+            summary += f" (각각 최대 {LOG_SEARCH_MAX_RESULTS}줄까지 표시)"
+        ttk.Label(window, text=summary, padding="5").pack(anchor=tk.W)
+        
+        result_text = scrolledtext.ScrolledText(window, wrap=tk.NONE)
+        result_text.pack(fill=tk.BOTH, expand=True)
+        lines = spilled + visible[:LOG_SEARCH_MAX_RESULTS]
+        result_text.insert(tk.END, "\n".join(lines))
+        result_text.config(state="disabled")
+    
+    def _log_tag(self, color: str) -> str:
+        """색상 태그 이름 (처음 사용할 때 한 번만 설정)"""
+        tag_name = f"color_{color}"
+        if tag_name not in self._log_tags:
             self.log_text.tag_config(tag_name, foreground=color)
-            
-            # 메시지 삽입
-            self.log_text.insert(tk.END, message + "\n", tag_name)
-            self.log_text.see(tk.END)
-        
-        # 메인 스레드에서 UI 업데이트
-        self.root.after(0, _update_log)
+            self._log_tags.add(tag_name)
+        return tag_name
 
 def main():
     root = tk.Tk()
     app = ADBManager(root)
     root.mainloop()
+    app.log_spill.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,268 @@
+"""
+AdbClient 테스트
+
+실제 adb 서버 대신 같은 호스트 프로토콜로 응답하는 가짜 서버를 임시 포트에 띄워
+장치 목록, shell v2 / shell: 종료 코드, sync pull/push를 확인합니다.
+
+실행: python -m unittest test_adb_client (또는 python -m pytest)
+"""
+import asyncio
+import os
+import stat
+import struct
+import tempfile
+import unittest
+
+from adb_manager import AdbClient, AdbError, AdbUnsupported, ShellSession
+
+
+# 가짜 장치: NEW1은 shell v2 지원, OLD1은 기존 shell:만 지원
+FEATURES = {"NEW1": "shell_v2,cmd,stat_v2", "OLD1": "cmd"}
+# 장치에서 실행할 명령별 (stdout, stderr, 종료 코드)
+SHELL_RESULTS = {
+    "echo hi": (b"hi\n", b"", 0),
+    "fail": (b"partial", b"boom\n", 3),
+}
+
+
+class FakeAdbServer:
+    """adb 호스트 프로토콜의 일부(host:devices-l, features, transport, shell, sync)만 구현한 가짜 서버"""
+    
+    def __init__(self):
+        self.files = {"/sdcard/test.bin": bytes(range(256)) * 1000}
+        self.dirs = {"/sdcard"}
+        self.server = None
+        self.port = None
+    
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+    
+    @staticmethod
+    async def _read_request(reader) -> str:
+        length = int(await reader.readexactly(4), 16)
+        return (await reader.readexactly(length)).decode()
+    
+    @staticmethod
+    def _okay(writer, payload: str = None):
+        writer.write(b"OKAY")
+        if payload is not None:
+            data = payload.encode()
+            writer.write(b"%04x" % len(data) + data)
+    
+    @staticmethod
+    def _fail(writer, message: str):
+        data = message.encode()
+        writer.write(b"FAIL" + b"%04x" % len(data) + data)
+    
+    async def _handle(self, reader, writer):
+        try:
+            request = await self._read_request(reader)
+            if request == "host:devices-l":
+                self._okay(writer, "".join(f"{serial:<22} device usb:1-1.{i + 1} transport_id:{i + 1}\n"
+                                           for i, serial in enumerate(FEATURES)))
+            elif request.startswith("host-serial:") and request.endswith(":features"):
+                self._okay(writer, FEATURES[request.split(":")[1]])
+            elif request.startswith("host:transport:"):
+                serial = request.split(":", 2)[2]
+                if serial not in FEATURES:
+                    self._fail(writer, f"device '{serial}' not found")
+                else:
+                    self._okay(writer)
+                    await self._service(serial, await self._read_request(reader), reader, writer)
+            else:
+                self._fail(writer, "unknown host service")
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _service(self, serial: str, service: str, reader, writer):
+        if service == "shell,v2,raw:":
+            self._okay(writer)
+            await self._interactive_shell(reader, writer)
+        elif service.startswith("shell,v2,raw:"):
+            if "shell_v2" not in FEATURES[serial]:
+                self._fail(writer, "closed")
+                return
+            self._okay(writer)
+            stdout, stderr, code = SHELL_RESULTS[service[len("shell,v2,raw:"):]]
+            # 패킷 경계가 줄 경계와 다르도록 나누어 보냄
+            for packet_id, data in ((1, stdout[:1]), (2, stderr), (1, stdout[1:])):
+                writer.write(struct.pack("<BI", packet_id, len(data)) + data)
+            writer.write(struct.pack("<BI", 3, 1) + bytes([code]))
+        elif service.startswith("shell:"):
+            # 명령 뒤에 붙은 "echo <표시>$?" 줄을 실행한 결과를 흉내 냄
+            command, marker_line = service[len("shell:"):].split("\n")
+            stdout, stderr, code = SHELL_RESULTS[command]
+            marker = marker_line[len("echo "):-len("$?")]
+            self._okay(writer)
+            writer.write(stdout + stderr + f"{marker}{code}\n".encode())
+        elif service == "sync:":
+            self._okay(writer)
+            await self._sync(reader, writer)
+        else:
+            self._fail(writer, "unknown service")
+    
+    async def _interactive_shell(self, reader, writer):
+        """
+        ShellSession이 표준 입력으로 보내는 스크립트를 받아 명령 결과와 표시를 돌려줌
+        
+        표시 뒤에 늦게 온 stderr와, 명령이 없을 때 백그라운드 작업이 낸 출력도 흉내 냄
+        """
+        while True:
+            packet_id, length = struct.unpack("<BI", await reader.readexactly(5))
+            script = (await reader.readexactly(length)).decode()
+            # "(\n<명령>\n) </dev/null\necho <표시>$?\necho <표시> >&2\n"
+            lines = script.split("\n")
+            command, marker = lines[1], lines[3][len("echo "):-len("$?")]
+            stdout, stderr, code = SHELL_RESULTS[command]
+            for packet_id, data in ((1, stdout), (2, stderr), (1, f"{marker}{code}\n".encode()),
+                                    (2, f"{marker}\n".encode()), (2, b"late\n")):
+                writer.write(struct.pack("<BI", packet_id, len(data)) + data)
+            await writer.drain()
+            await asyncio.sleep(0.05)
+            writer.write(struct.pack("<BI", 1, 11) + b"background\n")
+            await writer.drain()
+    
+    def _mode(self, path: str) -> int:
+        if path in self.files:
+            return stat.S_IFREG | 0o644
+        if path.rstrip("/") in self.dirs:
+            return stat.S_IFDIR | 0o755
+        return 0
+    
+    async def _sync(self, reader, writer):
+        while True:
+            header = await reader.readexactly(8)
+            command, length = header[:4], struct.unpack("<I", header[4:])[0]
+            if command == b"QUIT":
+                return
+            path = (await reader.readexactly(length)).decode()
+            
+            if command == b"STAT":
+                size = len(self.files.get(path, b""))
+                writer.write(b"STAT" + struct.pack("<III", self._mode(path), size, 0))
+            elif command == b"RECV":
+                data = self.files[path]
+                for i in range(0, len(data), 100000):
+                    chunk = data[i:i + 100000]
+                    writer.write(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+                writer.write(b"DONE" + struct.pack("<I", 0))
+            elif command == b"SEND":
+                remote = path.rsplit(",", 1)[0]
+                data = bytearray()
+                while True:
+                    chunk_header = await reader.readexactly(8)
+                    chunk_length = struct.unpack("<I", chunk_header[4:])[0]
+                    if chunk_header[:4] == b"DONE":
+                        break
+                    data += await reader.readexactly(chunk_length)
+                self.files[remote] = bytes(data)
+                writer.write(b"OKAY" + struct.pack("<I", 0))
+            await writer.drain()
+
+
+class AdbClientTest(unittest.IsolatedAsyncioTestCase):
+    
+    async def asyncSetUp(self):
+        self.server = FakeAdbServer()
+        await self.server.start()
+        self.client = AdbClient(port=self.server.port)
+        self.output = []
+        self.tmp = tempfile.TemporaryDirectory()
+    
+    async def asyncTearDown(self):
+        await self.server.stop()
+        self.tmp.cleanup()
+    
+    def on_output(self, stream: str, line: str):
+        self.output.append((stream, line))
+    
+    async def test_devices(self):
+        devices = await self.client.devices()
+        self.assertEqual([line.split()[0] for line in devices], ["NEW1", "OLD1"])
+        self.assertIn("usb:1-1.1", devices[0])
+    
+    async def test_features_cached(self):
+        self.assertIn("shell_v2", await self.client.features("NEW1"))
+        FEATURES["NEW1"] = "cmd"
+        try:
+            self.assertIn("shell_v2", await self.client.features("NEW1"))
+            self.client.forget("NEW1")
+            self.assertNotIn("shell_v2", await self.client.features("NEW1"))
+        finally:
+            FEATURES["NEW1"] = "shell_v2,cmd,stat_v2"
+    
+    async def test_shell_v2_exit_code_and_streams(self):
+        self.assertEqual(await self.client.shell("NEW1", "echo hi", self.on_output), 0)
+        self.assertEqual(self.output, [("OUT", "hi")])
+        
+        self.output.clear()
+        self.assertEqual(await self.client.shell("NEW1", "fail", self.on_output), 3)
+        # 개행 없이 끝난 stdout도 종료 시 전달
+        self.assertEqual(sorted(self.output), [("ERR", "boom"), ("OUT", "partial")])
+    
+    async def test_shell_legacy_exit_code(self):
+        self.assertEqual(await self.client.shell("OLD1", "fail", self.on_output), 3)
+        # shell:은 stderr가 stdout에 합쳐지고 종료 코드 표시 줄은 출력하지 않음
+        self.assertEqual(self.output, [("OUT", "partialboom")])
+    
+    async def test_unknown_device(self):
+        with self.assertRaises(AdbError):
+            await self.client.pull("NOPE", "/sdcard/test.bin", self.tmp.name)
+    
+    async def test_pull(self):
+        size = await self.client.pull("NEW1", "/sdcard/test.bin", self.tmp.name)
+        path = os.path.join(self.tmp.name, "test.bin")
+        self.assertEqual(size, len(self.server.files["/sdcard/test.bin"]))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), self.server.files["/sdcard/test.bin"])
+    
+    async def test_pull_missing_and_directory(self):
+        with self.assertRaises(AdbError):
+            await self.client.pull("NEW1", "/sdcard/none.bin", self.tmp.name)
+        with self.assertRaises(AdbUnsupported):
+            await self.client.pull("NEW1", "/sdcard", self.tmp.name)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+    
+    async def test_shell_session(self):
+        session = await self.client.open_shell("NEW1")
+        try:
+            self.assertEqual(await session.run("fail", self.on_output), 3)
+            self.assertEqual(sorted(self.output), [("ERR", "boom"), ("OUT", "partial")])
+            
+            # 이전 명령 뒤에 온 출력(late, background)은 다음 명령의 출력으로 전달하지 않음
+            await asyncio.sleep(0.1)
+            self.output.clear()
+            self.assertEqual(await session.run("echo hi", self.on_output), 0)
+            self.assertEqual(self.output, [("OUT", "hi")])
+            self.assertTrue(session.alive)
+        finally:
+            session.close()
+        self.assertFalse(session.alive)
+        
+        with self.assertRaises(AdbUnsupported):
+            await self.client.open_shell("OLD1")
+    
+    async def test_push(self):
+        data = os.urandom(AdbClient.SYNC_DATA_MAX * 2 + 123)
+        local = os.path.join(self.tmp.name, "up.bin")
+        with open(local, 'wb') as f:
+            f.write(data)
+        
+        # 장치 디렉토리로 보내면 같은 이름으로 저장
+        self.assertEqual(await self.client.push("NEW1", local, "/sdcard"), len(data))
+        self.assertEqual(self.server.files["/sdcard/up.bin"], data)
+        
+        await self.client.push("NEW1", local, "/sdcard/renamed.bin")
+        self.assertEqual(self.server.files["/sdcard/renamed.bin"], data)
+
+
+if __name__ == "__main__":
+    unittest.main()
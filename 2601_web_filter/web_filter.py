@@ -4,28 +4,1808 @@
 URL 목록과 키워드 목록을 파일에서 읽어와서 매칭되는 줄을 출력합니다.
 """
 
+import os
 import re
+import csv
 import sys
+import json
+import time
+import codecs
+import struct
+import hashlib
 import argparse
-import requests
-import pandas as pd
-from typing import List, Tuple
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse
 from html import unescape
 
+if TYPE_CHECKING:
+    import requests
+
+
+def _requests():
+    """
+    requests 모듈 반환
+    
+    requests는 import에만 100ms 가까이 걸리므로 실제로 요청을 보낼 때 불러옵니다.
+    캐시만으로 끝나는 실행에서는 import하지 않습니다.
+    """
+    import requests
+    return requests
+
+
+def _build_trie_pattern(words: List[str]) -> str:
+    """
+    문자열 목록을 트라이 구조의 정규식으로 변환
+    
+    공통 접두사를 한 번만 비교하므로 단순 alternation보다 빠르고,
+    같은 위치에서는 항상 가장 긴 문자열이 매칭됩니다.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    
+    def build(node: dict) -> str:
+        parts = []
+        # 분기가 없는 구간은 재귀 없이 이어 붙임
+        while len(node) == 1 and '' not in node:
+            ch, node = next(iter(node.items()))
+            parts.append(re.escape(ch))
+        alternatives = [re.escape(ch) + build(child) for ch, child in node.items() if ch]
+        if alternatives:
+            group = '(?:' + '|'.join(alternatives) + ')'
+            parts.append(group + '?' if '' in node else group)
+        return ''.join(parts)
+    
+    return build(trie)
+
+
+def _literal_factors(regex: str, min_length: int = 2) -> Optional[List[str]]:
+    """
+    정규식이 매칭하는 문자열이라면 반드시 하나 이상 포함하는 리터럴 문자열 목록 (소문자)
+    
+    정규식을 파싱해서 반드시 거쳐야 하는 리터럴 구간을 찾고, alternation은 모든 분기의
+    리터럴을 후보로 모읍니다. 그런 리터럴이 없으면(예: '\\d{4}') None을 반환합니다.
+    """
+    try:
+        from re import _parser as sre_parse, _constants as sre_constants
+    except ImportError:  # Python 3.10 이하
+        import sre_parse
+        import sre_constants
+    
+    repeats = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+               getattr(sre_constants, 'POSSESSIVE_REPEAT', sre_constants.MAX_REPEAT)}
+    atomic = getattr(sre_constants, 'ATOMIC_GROUP', None)
+    
+    def valid(factors: Optional[List[str]]) -> Optional[List[str]]:
+        # 소문자 변환 시 길이가 바뀌는 문자(예: 'İ')가 있으면 트라이로 찾을 수 없음
+        if not factors or any(len(f) < min_length or len(f.lower()) != len(f) for f in factors):
+            return None
+        return [f.lower() for f in factors]
+    
+    def better(candidate: Optional[List[str]], best: Optional[List[str]]) -> bool:
+        # 가장 짧은 후보가 길수록, 같으면 후보 수가 적을수록 선택성이 높음
+        if candidate is None:
+            return False
+        if best is None:
+            return True
+        return (min(map(len, candidate)), -len(candidate)) > (min(map(len, best)), -len(best))
+    
+    def factors_of(items) -> Optional[List[str]]:
+        best, run = None, []
+        for op, av in list(items) + [(None, None)]:
+            if op is sre_constants.LITERAL:
+                run.append(chr(av))
+                continue
+            if run:
+                candidate = valid([''.join(run)])
+                best = candidate if better(candidate, best) else best
+                run = []
+            
+            candidate = None
+            if op is sre_constants.SUBPATTERN:
+                candidate = factors_of(av[-1])
+            elif atomic is not None and op is atomic:
+                candidate = factors_of(av)
+            elif op in repeats and av[0] >= 1:
+                candidate = factors_of(av[2])
+            elif op is sre_constants.BRANCH:
+                candidate = []
+                for branch in av[1]:
+                    factors = factors_of(branch)
+                    if factors is None:
+                        candidate = None
+                        break
+                    candidate.extend(factors)
+                candidate = sorted(set(candidate)) if candidate else None
+            # 그 외(문자 집합, 앵커, 전후방 탐색, 역참조 등)는 리터럴 구간을 끊기만 함
+            best = candidate if better(candidate, best) else best
+        return best
+    
+    try:
+        return factors_of(sre_parse.parse(regex))
+    except Exception:
+        return None
+
+
+class KeywordMatcher:
+    """
+    모든 키워드를 한 번에 검사하는 매칭 엔진
+    
+    일반 키워드와 정규식 키워드에서 뽑은 필수 리터럴(factor)을 하나의 트라이 정규식으로 합쳐
+    줄을 한 번만 훑고, 일반 키워드는 그 결과만으로 판단합니다. 정규식은 자신의 리터럴이
+    줄에 있을 때만 검사하므로 대부분의 줄은 정규식을 하나도 실행하지 않고 걸러집니다.
+    기존과 동일하게 한 줄에 여러 키워드가 매칭되면 파일에서 먼저 나온 키워드가 선택됩니다.
+    
+    키워드가 MIN_KEYWORDS개보다 적으면 통합 패턴으로 한 번 훑는 비용이 키워드를 하나씩
+    검사하는 비용보다 크므로 통합 패턴을 만들지 않고 하나씩 검사합니다.
+    """
+    
+    # 통합 패턴을 사용하는 최소 키워드 수 (일반 키워드만이면 약 16개, 정규식이 섞이면
+    # 약 25개부터 통합 패턴이 빨라짐)
+    MIN_KEYWORDS = 20
+    
+    def __init__(self, keywords: List[Tuple[str, bool, re.Pattern]]):
+        """
+        Args:
+            keywords: _load_keywords가 반환한 (원본 키워드, 정규식 여부, 패턴) 목록
+        """
+        self.keywords = keywords
+        # 통합 패턴 사전 필터 사용 여부
+        self.prefiltered = len(keywords) >= self.MIN_KEYWORDS
+        
+        # 소문자 리터럴 -> (그 리터럴과 같은 일반 키워드 중 가장 먼저 나온 인덱스, 후보 정규식 인덱스 목록)
+        self._factors: Dict[str, Tuple[Optional[int], List[int]]] = {}
+        # 리터럴을 뽑을 수 없어 항상 검사하는 키워드 인덱스
+        self._always: List[int] = []
+        self._factor_pattern = None
+        
+        # 사전 필터 통계 (스레드별로 세고 stats에서 합산)
+        self._local = threading.local()
+        self._counters: List[List[int]] = []
+        self._counters_lock = threading.Lock()
+        
+        if not self.prefiltered:
+            return
+        
+        for idx, (keyword, is_regex, pattern) in enumerate(keywords):
+            if not is_regex:
+                lowered = keyword.lower()
+                # 소문자 변환 시 길이가 바뀌는 문자(예: 'İ')는 트라이로 표현할 수 없음
+                if len(lowered) == len(keyword):
+                    plain, regexes = self._factors.get(lowered, (None, []))
+                    self._factors[lowered] = (idx if plain is None else plain, regexes)
+                else:
+                    self._always.append(idx)
+                continue
+            
+            factors = _literal_factors(keyword)
+            if factors is None:
+                self._always.append(idx)
+                continue
+            for factor in factors:
+                plain, regexes = self._factors.setdefault(factor, (None, []))
+                regexes.append(idx)
+        
+        # 각 위치에서 시작하는 가장 긴 리터럴을 찾기 위한 lookahead 패턴
+        if self._factors:
+            trie = _build_trie_pattern(list(self._factors))
+            self._factor_pattern = re.compile(f'(?=({trie}))', re.IGNORECASE)
+    
+    @property
+    def unfiltered(self) -> List[str]:
+        """사전 필터를 적용할 수 없어 모든 줄에서 검사하는 키워드 목록"""
+        return [self.keywords[idx][0] for idx in self._always]
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """검사한 줄 수, 정규식을 하나도 실행하지 않고 걸러낸 줄 수, 실행한 정규식 검사 수"""
+        with self._counters_lock:
+            lines, rejected, regex_runs = (sum(c[i] for c in self._counters) for i in range(3))
+        return {'lines': lines, 'rejected': rejected, 'regex_runs': regex_runs}
+    
+    def _thread_counters(self) -> List[int]:
+        counters = getattr(self._local, 'counters', None)
+        if counters is None:
+            counters = self._local.counters = [0, 0, 0]
+            with self._counters_lock:
+                self._counters.append(counters)
+        return counters
+    
+    def _match_slow(self, line: str) -> Optional[int]:
+        """키워드를 하나씩 검사 (키워드가 적을 때, 드문 유니코드 대소문자 처리용)"""
+        for idx, (keyword, is_regex, pattern) in enumerate(self.keywords):
+            if pattern.search(line):
+                return idx
+        return None
+    
+    def match(self, line: str) -> Optional[int]:
+        """
+        줄에 매칭되는 키워드 중 파일에서 가장 먼저 나온 키워드의 인덱스 반환
+        
+        Returns:
+            키워드 인덱스, 매칭이 없으면 None
+        """
+        if not self.prefiltered:
+            return self._match_slow(line)
+        counters = self._thread_counters()
+        counters[0] += 1
+        
+        best = None
+        candidates = set()
+        if self._factor_pattern is not None:
+            for m in self._factor_pattern.finditer(line):
+                text = m.group(1).lower()
+                if text not in self._factors:
+                    # IGNORECASE와 lower()의 대소문자 규칙이 다른 문자가 섞인 경우
+                    return self._match_slow(line)
+                # 같은 위치에서 시작하는 더 짧은 리터럴은 가장 긴 매칭의 접두사
+                for end in range(1, len(text) + 1):
+                    entry = self._factors.get(text[:end])
+                    if entry is None:
+                        continue
+                    plain, regexes = entry
+                    if plain is not None and (best is None or plain < best):
+                        best = plain
+                    candidates.update(regexes)
+        
+        if not candidates and not self._always:
+            if best is None:
+                counters[1] += 1
+            return best
+        
+        for idx in sorted(candidates.union(self._always)):
+            if best is not None and idx >= best:
+                break
+            counters[2] += 1
+            if self.keywords[idx][2].search(line):
+                return idx
+        return best
+
+
+class HtmlLineTokenizer:
+    """
+    HTML을 조각(chunk) 단위로 받아서 정리된 줄을 점진적으로 만들어내는 토크나이저
+    
+    WebLineFilter._clean_html과 같은 규칙(<br> -> 개행, 태그 제거, 엔티티 디코딩)을
+    같은 순서로 적용하지만, 문서 전체 대신 다음 조각이 와야 판단할 수 있는
+    꼬리 부분만 버퍼에 남기므로 메모리 사용량이 가장 긴 줄 길이에 비례합니다.
+    """
+    
+    _BR_RE = re.compile(r'<br\s*/?>', re.IGNORECASE)
+    # 다음 조각과 합쳐지면 <br>이 될 수 있는 꼬리
+    _BR_PARTIAL_RE = re.compile(r'<(?:b(?:r\s*/?)?)?\Z', re.IGNORECASE)
+    # 다음 조각과 합쳐지면 다른 엔티티가 될 수 있는 꼬리 (html.unescape 규칙 기준)
+    _ENTITY_PARTIAL_RE = re.compile(r'&(?:#[0-9]*|#[xX][0-9a-fA-F]*|[^\t\n\f <&#;]{0,32})\Z')
+    
+    def __init__(self):
+        self._br_buf = ''       # 1단계: <br> 치환 대기
+        self._tag_buf = ''      # 2단계: 닫히지 않은 태그
+        self._tag_scanned = 0   # 2단계 버퍼에서 '>'를 이미 찾아본 위치
+        self._text_buf = ''     # 3단계: 엔티티 디코딩 대기
+        self._line_buf = ''     # 아직 개행을 만나지 않은 마지막 줄
+    
+    def feed(self, text: str) -> List[str]:
+        """HTML 조각을 추가하고 완성된 줄 목록 반환"""
+        return self._split_lines(self._unescape(self._strip_tags(self._replace_br(text))))
+    
+    def close(self) -> List[str]:
+        """남은 버퍼를 모두 처리하고 마지막 줄까지 반환"""
+        lines = self._split_lines(self._unescape(self._strip_tags(self._replace_br('', final=True),
+                                                                  final=True), final=True))
+        lines.append(self._line_buf)
+        self._line_buf = ''
+        return lines
+    
+    def _replace_br(self, text: str, final: bool = False) -> str:
+        buf = self._br_buf + text
+        hold = len(buf)
+        if not final:
+            # <br> 매칭에는 '<'가 하나뿐이므로 마지막 '<' 이후만 보류하면 충분
+            start = buf.rfind('<')
+            if start != -1 and self._BR_PARTIAL_RE.match(buf, start):
+                hold = start
+        self._br_buf = buf[hold:]
+        return self._BR_RE.sub('\n', buf[:hold])
+    
+    def _strip_tags(self, text: str, final: bool = False) -> str:
+        buf = self._tag_buf + text
+        out = []
+        pos = 0
+        while True:
+            start = buf.find('<', pos)
+            if start == -1:
+                out.append(buf[pos:])
+                pos = len(buf)
+                break
+            out.append(buf[pos:start])
+            end = buf.find('>', max(start + 1, self._tag_scanned))
+            if end == -1:
+                if final:
+                    # 끝까지 닫히지 않은 '<'는 태그가 아니므로 그대로 남김
+                    out.append(buf[start:])
+                    pos = len(buf)
+                else:
+                    self._tag_scanned = len(buf)
+                    pos = start
+                break
+            self._tag_scanned = 0
+            if end == start + 1:
+                # '<>'는 태그가 아님
+                out.append('<')
+                pos = start + 1
+            else:
+                pos = end + 1
+        self._tag_buf = buf[pos:]
+        if self._tag_buf:
+            self._tag_scanned -= pos
+        else:
+            self._tag_scanned = 0
+        return ''.join(out)
+    
+    def _unescape(self, text: str, final: bool = False) -> str:
+        buf = self._text_buf + text
+        hold = len(buf)
+        if not final:
+            start = buf.rfind('&')
+            if start != -1 and self._ENTITY_PARTIAL_RE.match(buf, start):
+                hold = start
+        self._text_buf = buf[hold:]
+        return unescape(buf[:hold])
+    
+    def _split_lines(self, text: str) -> List[str]:
+        if not text:
+            return []
+        lines = (self._line_buf + text).split('\n')
+        self._line_buf = lines.pop()
+        return lines
+
+
+class _HostState:
+    """HostScheduler가 호스트마다 유지하는 상태와 통계"""
+    
+    def __init__(self, limit: int, burst: float):
+        self.limit = float(limit)   # 현재 동시 요청 한도 (AIMD로 조절)
+        self.min_limit = limit      # 실행 중 가장 낮았던 한도 (통계)
+        self.in_flight = 0
+        self.tokens = burst         # 토큰 버킷
+        self.refilled = time.monotonic()
+        self.blocked_until = 0.0    # Retry-After로 요청을 보내지 않을 시각
+        self.decreased = 0.0        # 마지막으로 한도를 줄인 시각
+        self.best_latency = None    # 관측된 가장 짧은 응답 시간 (기준값)
+        self.latency = None         # 응답 시간 지수 이동 평균
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0, 'waited': 0.0,
+                      'responses': 0, 'latency_sum': 0.0}
+
+
+class HostSlot:
+    """
+    URL 하나의 요청에 대한 호스트 슬롯
+    
+    실제로 네트워크 요청을 보낼 때만 acquire하므로 캐시에서 바로 읽는 페이지는
+    토큰이나 동시 요청 한도를 쓰지 않습니다. with 블록이 끝날 때 슬롯을 반환합니다.
+    """
+    
+    def __init__(self, scheduler: 'HostScheduler', host: str):
+        self.scheduler = scheduler
+        self.host = host
+        self.attempts = 0
+        self._started = None
+    
+    def __enter__(self) -> 'HostSlot':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+    
+    def acquire(self):
+        """호스트의 토큰과 동시 요청 한도를 얻을 때까지 대기"""
+        if self._started is None:
+            started = time.perf_counter()
+            self.scheduler._acquire(self.host)
+            metrics = _current_metrics()
+            if metrics is not None:
+                metrics.wait += time.perf_counter() - started
+            self._started = time.monotonic()
+    
+    def release(self):
+        """슬롯 반환 (acquire하지 않았으면 아무것도 하지 않음)"""
+        if self._started is not None:
+            self._started = None
+            self.scheduler._release(self.host)
+    
+    def failed(self):
+        """요청이 연결 오류/타임아웃으로 실패했음을 기록"""
+        if self._started is not None:
+            self.scheduler._record(self.host, None, error=True)
+    
+    def retry(self, response: 'requests.Response') -> bool:
+        """
+        응답 헤더를 받은 시점에 응답 시간과 상태를 기록
+        
+        429/503 응답이고 재시도 횟수가 남아 있으면 응답을 닫고, Retry-After(없으면 지수 백오프)
+        동안 호스트에 요청을 보내지 않도록 한 뒤 슬롯을 다시 얻습니다.
+        
+        Returns:
+            같은 요청을 다시 보내야 하면 True
+        """
+        latency = time.monotonic() - self._started
+        status = response.status_code
+        if status not in HostScheduler.THROTTLE_STATUSES:
+            self.scheduler._record(self.host, latency, error=status >= 500)
+            return False
+        
+        delay = HostScheduler.parse_retry_after(response.headers.get('Retry-After'))
+        if delay is None:
+            delay = self.scheduler.backoff * (2 ** self.attempts)
+        self.scheduler._record(self.host, latency, throttled=delay)
+        if self.attempts >= self.scheduler.retries:
+            return False
+        
+        self.attempts += 1
+        response.close()
+        self.release()
+        self.acquire()
+        return True
+
+
+class HostScheduler:
+    """
+    호스트별 요청 속도와 동시 요청 수를 조절하는 스케줄러
+    
+    - 토큰 버킷: 호스트마다 초당 rate개의 요청만 보냅니다 (rate가 0이면 제한 없음)
+    - Retry-After: 429/503 응답을 받으면 지정된 시간 동안 그 호스트로 요청을 보내지 않고 다시 시도합니다
+    - AIMD: 요청이 성공하면 동시 요청 한도를 조금씩(한도당 1) 늘리고, 제한 응답, 5xx, 연결 오류,
+      평소보다 크게 늘어난 응답 시간을 관측하면 절반으로 줄입니다 (1 ~ max_per_host)
+    """
+    
+    THROTTLE_STATUSES = (429, 503)
+    # Retry-After 값의 최대 대기 시간 (초)
+    MAX_RETRY_AFTER = 120.0
+    # 응답 시간 평균이 기준값의 이 배수를 넘으면 과부하로 판단
+    LATENCY_FACTOR = 3.0
+    # 이보다 짧은 응답 시간 차이는 과부하 판단에 사용하지 않음 (초)
+    MIN_LATENCY = 0.05
+    # 응답 시간 지수 이동 평균 가중치
+    LATENCY_ALPHA = 0.3
+    
+    def __init__(self, max_per_host: int, rate: float = 0.0, retries: int = 2, backoff: float = 0.5):
+        """
+        Args:
+            max_per_host: 호스트 하나에 동시에 보낼 수 있는 최대 요청 수 (처음 한도)
+            rate: 호스트당 초당 요청 수 (0이면 제한 없음)
+            retries: 429/503 응답 재시도 횟수
+            backoff: Retry-After가 없을 때 사용할 지수 백오프 계수 (초)
+        """
+        self.max_per_host = max(1, max_per_host)
+        self.rate = max(0.0, rate)
+        self.burst = float(self.max_per_host)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self._hosts: Dict[str, _HostState] = {}
+        self._cond = threading.Condition()
+    
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Retry-After 헤더(초 또는 HTTP 날짜)를 대기 시간(초)으로 변환"""
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            delay = float(value)
+        else:
+            from email.utils import parsedate_to_datetime
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError, IndexError):
+                return None
+        return min(max(0.0, delay), HostScheduler.MAX_RETRY_AFTER)
+    
+    def slot(self, url: str) -> HostSlot:
+        """URL의 호스트에 대한 슬롯 (요청을 보내기 전에 acquire 필요)"""
+        return HostSlot(self, urlparse(url).netloc.lower())
+    
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.max_per_host, self.burst)
+        return state
+    
+    def _acquire(self, host: str):
+        with self._cond:
+            state = self._state(host)
+            started = time.monotonic()
+            while True:
+                now = time.monotonic()
+                if self.rate:
+                    state.tokens = min(self.burst, state.tokens + (now - state.refilled) * self.rate)
+                    state.refilled = now
+                
+                if state.in_flight >= int(state.limit):
+                    timeout = None  # 다른 요청이 끝나면 notify
+                elif now < state.blocked_until:
+                    timeout = state.blocked_until - now
+                elif self.rate and state.tokens < 1:
+                    timeout = (1 - state.tokens) / self.rate
+                else:
+                    break
+                self._cond.wait(timeout)
+            
+            if self.rate:
+                state.tokens -= 1
+            state.in_flight += 1
+            state.stats['requests'] += 1
+            state.stats['waited'] += now - started
+    
+    def _release(self, host: str):
+        with self._cond:
+            self._hosts[host].in_flight -= 1
+            self._cond.notify_all()
+    
+    def _record(self, host: str, latency: Optional[float], error: bool = False,
+                throttled: Optional[float] = None):
+        """요청 결과로 동시 요청 한도 조절 (AIMD)"""
+        with self._cond:
+            state = self._hosts[host]
+            now = time.monotonic()
+            overloaded = error or throttled is not None
+            
+            if latency is not None:
+                state.stats['responses'] += 1
+                state.stats['latency_sum'] += latency
+            if latency is not None and not overloaded:
+                # 제한/오류 응답은 보통 훨씬 빨리 오므로 응답 시간 기준값에서 제외
+                state.latency = latency if state.latency is None else \
+                    self.LATENCY_ALPHA * latency + (1 - self.LATENCY_ALPHA) * state.latency
+                if state.best_latency is None or latency < state.best_latency:
+                    state.best_latency = latency
+                if state.latency > self.LATENCY_FACTOR * max(state.best_latency, self.MIN_LATENCY):
+                    overloaded = True
+            
+            if error:
+                state.stats['errors'] += 1
+            if throttled is not None:
+                state.stats['throttled'] += 1
+                state.blocked_until = max(state.blocked_until, now + throttled)
+            
+            if overloaded:
+                # 동시에 진행 중이던 요청들이 같은 과부하를 여러 번 보고하므로
+                # 평균 응답 시간 한 번 동안에는 한 번만 줄임
+                if now - state.decreased >= max(state.latency or 0.0, self.MIN_LATENCY):
+                    state.limit = max(1.0, state.limit / 2)
+                    state.min_limit = min(state.min_limit, int(state.limit))
+                    state.decreased = now
+            else:
+                state.limit = min(float(self.max_per_host), state.limit + 1 / state.limit)
+            self._cond.notify_all()
+    
+    def summary(self) -> List[Dict[str, object]]:
+        """호스트별 통계 목록 (요청을 보낸 호스트만)"""
+        with self._cond:
+            rows = []
+            for host, state in self._hosts.items():
+                stats = state.stats
+                if not stats['requests']:
+                    continue
+                rows.append({
+                    'host': host,
+                    'requests': stats['requests'],
+                    'throttled': stats['throttled'],
+                    'errors': stats['errors'],
+                    'avg_latency': stats['latency_sum'] / stats['responses'] if stats['responses'] else None,
+                    'waited': stats['waited'],
+                    'limit': int(state.limit),
+                    'min_limit': state.min_limit,
+                })
+            return rows
+
+
+class UrlMetrics:
+    """
+    URL 하나를 처리하는 동안의 단계별 시간(초)과 크기
+    
+    wait는 호스트 슬롯 대기(속도 제한, Retry-After 포함), match는 전체 시간에서
+    나머지 단계를 뺀 키워드 검색 시간입니다.
+    """
+    
+    STAGES = ('wait', 'dns', 'connect', 'ttfb', 'download', 'clean', 'match', 'total')
+    __slots__ = ('url', 'ok', 'cache') + STAGES + ('bytes', 'lines', 'matches')
+    
+    def __init__(self, url: str):
+        self.url = url
+        self.ok = False
+        self.cache = None   # 'fresh'(요청 생략), 'revalidated'(304) 또는 None
+        for name in self.STAGES:
+            setattr(self, name, 0.0)
+        self.bytes = 0
+        self.lines = 0
+        self.matches = 0
+    
+    def as_dict(self) -> Dict[str, object]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# 워커 스레드에서 처리 중인 URL의 UrlMetrics (연결/본문 읽기 단계에서 기록)
+_metrics_local = threading.local()
+
+
+def _current_metrics() -> Optional[UrlMetrics]:
+    return getattr(_metrics_local, 'url', None)
+
+
+class RunMetrics:
+    """
+    실행 전체의 URL별 측정값과 단계별 히스토그램
+    
+    --metrics 파일 확장자가 .prom이면 Prometheus 텍스트 형식, 그 외에는 JSON으로 저장합니다.
+    """
+    
+    # 히스토그램 구간 상한 (초, Prometheus 기본 구간)
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self, urls: List[str]):
+        """
+        Args:
+            urls: URL 목록 (측정값은 처리가 끝난 순서와 관계없이 이 순서로 저장)
+        """
+        self._order = {}
+        for idx, url in enumerate(urls):
+            self._order.setdefault(url, idx)
+        self.urls: List[UrlMetrics] = []
+        self._lock = threading.Lock()
+    
+    def add(self, metrics: UrlMetrics):
+        with self._lock:
+            self.urls.append(metrics)
+    
+    def histogram(self, stage: str) -> List[int]:
+        """단계별 시간의 누적 구간 개수 (마지막은 +Inf)"""
+        counts = [0] * (len(self.BUCKETS) + 1)
+        for m in self.urls:
+            value = getattr(m, stage)
+            for i, bound in enumerate(self.BUCKETS):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+        return counts
+    
+    def totals(self) -> Dict[str, float]:
+        totals = {stage: sum(getattr(m, stage) for m in self.urls) for stage in UrlMetrics.STAGES}
+        for name in ('bytes', 'lines', 'matches'):
+            totals[name] = sum(getattr(m, name) for m in self.urls)
+        return totals
+    
+    def print_summary(self):
+        """단계별 합계와 URL별 전체 처리 시간 분포 출력"""
+        if not self.urls:
+            return
+        totals = self.totals()
+        network = totals['dns'] + totals['connect'] + totals['ttfb'] + totals['download']
+        print(f"단계별 시간 합계: 네트워크 {network:.2f}s (DNS {totals['dns']:.2f}s, 연결 {totals['connect']:.2f}s, "
+              f"TTFB {totals['ttfb']:.2f}s, 다운로드 {totals['download']:.2f}s), "
+              f"호스트 대기 {totals['wait']:.2f}s, HTML 정리 {totals['clean']:.2f}s, 검색 {totals['match']:.2f}s")
+        print(f"URL별 처리 시간 분포 ({len(self.urls)}개):")
+        counts = self.histogram('total')
+        previous = 0
+        labels = [f"<= {bound:g}s" for bound in self.BUCKETS] + [f"> {self.BUCKETS[-1]:g}s"]
+        for label, count in zip(labels, counts):
+            in_bucket = count - previous
+            previous = count
+            if in_bucket:
+                bar = '#' * max(1, round(40 * in_bucket / len(self.urls)))
+                print(f"  {label:>9} {in_bucket:>6}  {bar}")
+        print()
+    
+    def save(self, filepath: str):
+        """측정값을 JSON 또는 Prometheus 텍스트 형식(.prom)으로 저장"""
+        try:
+            if filepath.lower().endswith('.prom'):
+                content = self._prometheus()
+            else:
+                content = json.dumps({
+                    'totals': self.totals(),
+                    'buckets': list(self.BUCKETS),
+                    'histograms': {stage: self.histogram(stage) for stage in UrlMetrics.STAGES},
+                    'urls': [m.as_dict() for m in sorted(self.urls, key=lambda m: self._order.get(m.url, 0))],
+                }, ensure_ascii=False, indent=2)
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(content)
+            print(f"✓ 측정값이 '{filepath}'에 저장되었습니다.\n")
+        except OSError as e:
+            print(f"⚠️  측정값 저장 오류: {e}\n")
+    
+    def _prometheus(self) -> str:
+        lines = [
+            '# HELP web_filter_stage_seconds Per-URL time spent in each processing stage.',
+            '# TYPE web_filter_stage_seconds histogram',
+        ]
+        for stage in UrlMetrics.STAGES:
+            counts = self.histogram(stage)
+            for bound, count in zip(self.BUCKETS, counts):
+                lines.append(f'web_filter_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {count}')
+            lines.append(f'web_filter_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {counts[-1]}')
+            lines.append(f'web_filter_stage_seconds_sum{{stage="{stage}"}} '
+                         f'{sum(getattr(m, stage) for m in self.urls):.6f}')
+            lines.append(f'web_filter_stage_seconds_count{{stage="{stage}"}} {counts[-1]}')
+        
+        totals = self.totals()
+        for name, help_text in (('bytes', 'Response body bytes downloaded.'),
+                                ('lines', 'Cleaned lines searched.'),
+                                ('matches', 'Matched lines.')):
+            lines.append(f'# HELP web_filter_{name}_total {help_text}')
+            lines.append(f'# TYPE web_filter_{name}_total counter')
+            lines.append(f'web_filter_{name}_total {totals[name]}')
+        
+        lines.append('# HELP web_filter_urls_total URLs processed by result.')
+        lines.append('# TYPE web_filter_urls_total counter')
+        ok = sum(1 for m in self.urls if m.ok)
+        lines.append(f'web_filter_urls_total{{result="ok"}} {ok}')
+        lines.append(f'web_filter_urls_total{{result="failed"}} {len(self.urls) - ok}')
+        for cache in ('fresh', 'revalidated'):
+            lines.append(f'web_filter_urls_total{{result="cache_{cache}"}} '
+                         f'{sum(1 for m in self.urls if m.cache == cache)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _timed_adapter(**kwargs) -> 'requests.adapters.HTTPAdapter':
+    """
+    새 연결의 DNS 조회 시간과 TCP(TLS 포함) 연결 시간을 기록하는 HTTPAdapter 생성
+    
+    urllib3 연결 클래스를 상속하므로 requests를 불러온 뒤에만 정의할 수 있습니다.
+    기록은 요청을 보낸 워커 스레드의 UrlMetrics에 더해집니다.
+    """
+    import socket
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.exceptions import NewConnectionError
+    
+    class TimedConnectionMixin:
+        _resolve_time = 0.0
+        
+        def _new_conn(self):
+            if _current_metrics() is None:
+                return super()._new_conn()
+            
+            host = self._dns_host
+            started = time.perf_counter()
+            try:
+                address = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+            except (OSError, IndexError):
+                address = host  # 이름 해석 오류는 urllib3가 원래 방식대로 보고
+            self._resolve_time = time.perf_counter() - started
+            
+            # 조회한 주소로 연결 (TLS 인증서 확인과 SNI에는 원래 호스트 이름이 그대로 사용됨)
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except NewConnectionError:
+                if address == host:
+                    raise
+                # 첫 번째 주소로 연결할 수 없으면 urllib3가 모든 주소를 시도하도록 함
+                self._dns_host = host
+                return super()._new_conn()
+            finally:
+                self._dns_host = host
+        
+        def connect(self):
+            self._resolve_time = 0.0
+            started = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                metrics = _current_metrics()
+                if metrics is not None:
+                    # 연결 시간은 TCP 연결과 TLS 핸드셰이크 (DNS 조회 제외, 실패한 연결 시도 포함)
+                    metrics.dns += self._resolve_time
+                    metrics.connect += time.perf_counter() - started - self._resolve_time
+    
+    class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+        pass
+    
+    class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+        pass
+    
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+    
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+    
+    class TimedHTTPAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **pool_kwargs):
+            super().init_poolmanager(*args, **pool_kwargs)
+            self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool,
+                                                       'https': TimedHTTPSConnectionPool}
+    
+    return TimedHTTPAdapter(**kwargs)
+
+
+class ResponseCache:
+    """
+    URL별 응답 본문을 디스크에 저장하는 HTTP 캐시
+    
+    URL의 SHA-256 해시를 키로 `<키>.body`(본문)와 `<키>.json`(ETag, Last-Modified,
+    인코딩, 저장 시각)을 저장합니다. TTL 이내의 항목은 요청 없이 사용하고, 그 이후에는
+    조건부 GET(If-None-Match/If-Modified-Since)으로 재검증합니다. 전체 크기가
+    max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다(LRU).
+    """
+    
+    def __init__(self, cache_dir: str, ttl: float = 3600, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: 캐시 디렉터리 경로 (없으면 생성)
+            ttl: 재검증 없이 사용할 수 있는 시간 (초)
+            max_bytes: 캐시 본문 전체의 최대 크기 (바이트)
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        # 통계 (fresh: 요청 없이 사용, revalidated: 304 응답, stored: 새로 저장)
+        self.stats = {'fresh': 0, 'revalidated': 0, 'stored': 0}
+        self._stats_lock = threading.Lock()
+    
+    def touch(self, url: str):
+        """본문을 읽지 않고 사용한 경우에도 LRU 사용 시각 갱신"""
+        try:
+            os.utime(self._path(url, 'body'))
+        except OSError:
+            pass
+    
+    def _path(self, url: str, ext: str) -> str:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.{ext}")
+    
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+    
+    def lookup(self, url: str) -> Optional[dict]:
+        """
+        저장된 항목의 메타데이터 반환
+        
+        Returns:
+            메타데이터 딕셔너리 ('fresh' 키에 TTL 이내 여부 포함), 없으면 None
+        """
+        try:
+            with open(self._path(url, 'json'), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url or not os.path.exists(self._path(url, 'body')):
+            return None
+        entry['fresh'] = time.time() - entry.get('stored_at', 0) < self.ttl
+        return entry
+    
+    @staticmethod
+    def conditional_headers(entry: dict) -> Dict[str, str]:
+        """재검증 요청에 사용할 조건부 헤더"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def iter_body(self, url: str, chunk_size: int) -> Iterator[bytes]:
+        """저장된 본문을 조각 단위로 읽음 (LRU를 위해 사용 시각 갱신)"""
+        path = self._path(url, 'body')
+        os.utime(path)
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    
+    def hit(self, url: str, entry: dict, response: Optional['requests.Response'] = None):
+        """
+        저장된 항목을 사용했음을 기록
+        
+        Args:
+            response: 304 응답 (재검증한 경우). 새 검증자로 메타데이터를 갱신합니다.
+        """
+        if response is None:
+            self._count('fresh')
+            return
+        self._count('revalidated')
+        entry = dict(entry, stored_at=time.time())
+        entry['etag'] = response.headers.get('ETag', entry.get('etag'))
+        entry['last_modified'] = response.headers.get('Last-Modified', entry.get('last_modified'))
+        self._write_meta(url, entry)
+    
+    def store(self, url: str, response: 'requests.Response', chunks: Iterable[bytes],
+              info: dict = None) -> Iterator[bytes]:
+        """
+        응답 본문 조각을 그대로 내보내면서 캐시에 기록
+        
+        본문을 끝까지 읽은 경우에만 캐시에 반영하고, 중간에 실패하거나 소비가
+        중단되면 임시 파일을 삭제합니다.
+        
+        Args:
+            info: 저장이 끝나면 본문 해시('sha256')를 기록할 딕셔너리 (선택사항)
+        """
+        if 'no-store' in response.headers.get('Cache-Control', '').lower():
+            yield from chunks
+            return
+        
+        body_path = self._path(url, 'body')
+        tmp_path = f"{body_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        digest = hashlib.sha256()
+        completed = False
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    yield chunk
+            os.replace(tmp_path, body_path)
+            completed = True
+        finally:
+            if not completed:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        
+        self._write_meta(url, {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'encoding': response.encoding,
+            'stored_at': time.time(),
+            'sha256': digest.hexdigest(),
+        })
+        if info is not None:
+            info['sha256'] = digest.hexdigest()
+        self._count('stored')
+    
+    def _write_meta(self, url: str, entry: dict):
+        entry = {k: v for k, v in entry.items() if k != 'fresh'}
+        meta_path = self._path(url, 'json')
+        tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+    
+    def prune(self):
+        """전체 크기가 max_bytes 이하가 될 때까지 오래 사용하지 않은 항목 삭제"""
+        entries = []
+        total = 0
+        # 본문과 함께 하위 디렉터리의 정리된 텍스트(.lines)도 같은 용량 제한에 포함
+        for dirpath, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(('.body', '.lines')):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            stale_paths = [path]
+            if path.endswith('.body'):
+                stale_paths.append(path[:-len('.body')] + '.json')
+            for stale in stale_paths:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            total -= size
+
+
+class CleanedTextStore:
+    """
+    HTML을 정리한 줄 목록을 본문 해시별로 저장하는 저장소
+    
+    `<sha256>.lines` 파일에 매직 헤더 뒤로 (4바이트 길이 + UTF-8 줄) 레코드를
+    순서대로 기록합니다. 같은 본문을 다시 처리할 때 HTML 정리 없이 줄을
+    하나씩 읽어서 바로 키워드 검색에 사용할 수 있습니다.
+    """
+    
+    # 파일 형식이나 HtmlLineTokenizer 규칙이 바뀌면 버전을 올려 기존 파일을 무시
+    MAGIC = b'WLT1'
+    _LENGTH = struct.Struct('<I')
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        
+        # 통계 (reused: 저장된 텍스트 사용, saved: 새로 저장)
+        self.stats = {'reused': 0, 'saved': 0}
+        self._stats_lock = threading.Lock()
+    
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.lines")
+    
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+    
+    def open_lines(self, digest: str) -> Optional[Iterator[str]]:
+        """
+        저장된 줄을 차례로 읽는 제너레이터 반환
+        
+        Returns:
+            줄 제너레이터, 저장된 텍스트가 없거나 형식이 다르면 None
+        """
+        path = self._path(digest)
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return None
+        if f.read(len(self.MAGIC)) != self.MAGIC:
+            f.close()
+            return None
+        os.utime(path)
+        self._count('reused')
+        return self._read_lines(f)
+    
+    def _read_lines(self, f, block_size: int = 1024 * 1024) -> Iterator[str]:
+        with f:
+            size = self._LENGTH.size
+            unpack_from = self._LENGTH.unpack_from
+            buf = b''
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                buf += block
+                # 블록 안에 완전히 들어 있는 레코드만 디코딩하고 나머지는 다음 블록과 합침
+                pos = 0
+                end = len(buf)
+                while pos + size <= end:
+                    (length,) = unpack_from(buf, pos)
+                    if pos + size + length > end:
+                        break
+                    yield buf[pos + size:pos + size + length].decode('utf-8', 'surrogatepass')
+                    pos += size + length
+                buf = buf[pos:]
+    
+    def record(self, lines: Iterable[str], info: dict) -> Iterator[str]:
+        """
+        줄을 그대로 내보내면서 저장
+        
+        끝까지 소비된 경우에만 info['sha256'] 이름으로 저장하고,
+        중간에 중단되면 임시 파일을 삭제합니다.
+        
+        Args:
+            info: 본문 해시('sha256')를 담은 딕셔너리 (본문을 다 읽은 뒤에 채워져도 됨)
+        """
+        tmp_path = os.path.join(self.directory, f"{os.getpid()}.{threading.get_ident()}.lines.tmp")
+        completed = False
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(self.MAGIC)
+                pack = self._LENGTH.pack
+                for line in lines:
+                    data = line.encode('utf-8', 'surrogatepass')
+                    f.write(pack(len(data)))
+                    f.write(data)
+                    yield line
+            if info.get('sha256'):
+                os.replace(tmp_path, self._path(info['sha256']))
+                completed = True
+                self._count('saved')
+        finally:
+            if not completed:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+
+class MatchIndex:
+    """
+    이전 실행의 줄별 매칭 결과를 본문 해시별로 보관하는 증분 검색 인덱스
+    
+    키워드 파일이 바뀌어도 본문이 같은 페이지는 추가/삭제된 키워드만 다시 검사합니다.
+    유지된 키워드의 상대 순서가 같다면 다음 규칙으로 "파일에서 먼저 나온 키워드 우선"
+    결과를 그대로 재현할 수 있습니다.
+    
+    - 이전에 매칭이 없던 줄: 추가된 키워드만 검사
+    - 유지된 키워드가 매칭된 줄: 그 키워드보다 앞에 추가된 키워드만 검사
+    - 삭제된 키워드가 매칭된 줄: 전체 키워드로 다시 검사
+    """
+    
+    VERSION = 1
+    # 이전에 삭제된 키워드가 매칭된 줄 표시
+    REMOVED = -1
+    
+    def __init__(self, path: str, keywords: List[Tuple[str, bool, re.Pattern]]):
+        """
+        Args:
+            path: 인덱스 파일 경로 (JSON)
+            keywords: 현재 키워드 목록
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._pages: Dict[str, List[List[int]]] = {}
+        
+        current = [(is_regex, keyword) for keyword, is_regex, _ in keywords]
+        self._keys = current
+        first_index: Dict[Tuple[bool, str], int] = {}
+        for idx, key in enumerate(current):
+            first_index.setdefault(key, idx)
+        
+        previous, self._previous_pages = self._load()
+        previous_set = set(previous)
+        
+        # 유지된 키워드의 상대 순서가 바뀌면 이전 결과를 재사용할 수 없음
+        retained_now = [key for key in dict.fromkeys(current) if key in previous_set]
+        retained_before = [key for key in dict.fromkeys(previous) if key in first_index]
+        if retained_now != retained_before:
+            if self._previous_pages:
+                print("⚠️  키워드 순서가 바뀌어 증분 검색 인덱스를 사용하지 않습니다.")
+            self._previous_pages = {}
+        
+        # 이전 키워드 위치 -> 현재 키워드 위치 (삭제된 경우 REMOVED)
+        self._remap = [first_index.get(key, self.REMOVED) for key in previous]
+        self.added = [idx for idx, key in enumerate(current)
+                      if key not in previous_set and first_index[key] == idx]
+        self.removed = len(previous_set - set(first_index))
+        self._added_matcher = KeywordMatcher([keywords[idx] for idx in self.added]) if self.added else None
+        
+        self.stats = {'reused': 0, 'rescanned': 0}
+    
+    def _load(self) -> Tuple[List[Tuple[bool, str]], Dict[str, List[List[int]]]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return [], {}
+        if data.get('version') != self.VERSION:
+            return [], {}
+        return [(bool(is_regex), keyword) for is_regex, keyword in data['keywords']], data['pages']
+    
+    def previous(self, digest: Optional[str]) -> Optional[Dict[int, int]]:
+        """
+        본문 해시에 대한 이전 매칭 결과를 현재 키워드 위치로 변환해서 반환
+        
+        Returns:
+            {줄 번호: 현재 키워드 위치 또는 REMOVED}, 이전 결과가 없으면 None
+        """
+        if not digest:
+            return None
+        entries = self._previous_pages.get(digest)
+        if entries is None:
+            return None
+        return {line_num: self._remap[pos] for line_num, pos in entries}
+    
+    def match_added(self, line: str) -> Optional[int]:
+        """추가된 키워드 중 가장 먼저 나온 매칭 키워드의 현재 위치"""
+        if self._added_matcher is None:
+            return None
+        idx = self._added_matcher.match(line)
+        return None if idx is None else self.added[idx]
+    
+    def record(self, digest: Optional[str], matches: List[Tuple[int, int, str]], reused: bool):
+        """이번 실행의 매칭 결과 (줄 번호, 키워드 위치, 줄) 기록"""
+        if not digest:
+            return
+        with self._lock:
+            self._pages[digest] = [[line_num, idx] for line_num, idx, _ in matches]
+            self.stats['reused' if reused else 'rescanned'] += 1
+    
+    def save(self):
+        """이번 실행에서 처리한 페이지의 인덱스를 파일에 저장"""
+        data = {
+            'version': self.VERSION,
+            'keywords': [[is_regex, keyword] for is_regex, keyword in self._keys],
+            'pages': self._pages,
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class CheckpointJournal:
+    """
+    처리가 끝난 URL과 매칭 결과를 한 줄씩 추가하는 체크포인트 파일 (JSON Lines)
+    
+    첫 줄은 키워드 지문이 담긴 헤더이고, 이후 URL 하나가 끝날 때마다
+    {"url": ..., "matches": [[줄 번호, 키워드, 줄 내용], ...]} 한 줄을 추가합니다.
+    가져오기에 실패한 URL은 기록하지 않으므로 재개할 때 다시 시도합니다.
+    재개할 때는 URL별 파일 위치만 메모리에 두고, 결과는 출력할 차례가 되었을 때 읽습니다.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, path: str, keywords: List[Tuple[str, bool, re.Pattern]], resume: bool = False):
+        """
+        Args:
+            path: 체크포인트 파일 경로
+            keywords: 현재 키워드 목록 (바뀌면 이전 결과를 사용하지 않음)
+            resume: 기존 파일의 결과를 이어서 사용할지 여부 (False면 새로 시작)
+        """
+        self.path = path
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [[is_regex, keyword] for keyword, is_regex, _ in keywords], ensure_ascii=False
+        ).encode('utf-8')).hexdigest()
+        # 이전 실행에서 끝난 URL -> 기록의 파일 위치
+        self._offsets: Dict[str, int] = {}
+        self._reader = None
+        
+        end = self._load() if resume else None
+        if end is None:
+            self._file = open(path, 'wb')
+            self._append({'version': self.VERSION, 'keywords': self.fingerprint})
+        else:
+            # 중단되면서 마지막 줄이 쓰다 만 상태로 남았을 수 있으므로 잘라내고 이어서 기록
+            self._file = open(path, 'r+b')
+            self._file.truncate(end)
+            self._file.seek(end)
+    
+    def _load(self) -> Optional[int]:
+        """기존 파일을 읽어 URL별 위치를 기록하고 마지막 온전한 줄의 끝 위치 반환"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            line = f.readline()
+            try:
+                header = json.loads(line)
+            except ValueError:
+                header = None
+            if not isinstance(header, dict) or header.get('version') != self.VERSION:
+                print(f"⚠️  체크포인트 파일 '{self.path}'을 읽을 수 없어 처음부터 시작합니다.")
+                return None
+            if header.get('keywords') != self.fingerprint:
+                print("⚠️  키워드가 바뀌어 이전 체크포인트를 사용하지 않고 처음부터 시작합니다.")
+                return None
+            
+            offset = len(line)
+            for line in f:
+                try:
+                    url = json.loads(line)['url'] if line.endswith(b'\n') else None
+                except (ValueError, KeyError, TypeError):
+                    url = None
+                if url is None:
+                    break
+                self._offsets[url] = offset
+                offset += len(line)
+            return offset
+    
+    @property
+    def resumed(self) -> int:
+        """이전 실행에서 끝난 URL 수"""
+        return len(self._offsets)
+    
+    def done(self, url: str) -> bool:
+        """이전 실행에서 끝난 URL인지 여부"""
+        return url in self._offsets
+    
+    def load(self, url: str) -> List[Tuple[int, str, str]]:
+        """이전 실행에서 기록한 URL의 매칭 목록"""
+        if self._reader is None:
+            self._reader = open(self.path, 'rb')
+        self._reader.seek(self._offsets[url])
+        record = json.loads(self._reader.readline())
+        return [tuple(match) for match in record['matches']]
+    
+    def record(self, url: str, matches: List[Tuple[int, str, str]]):
+        """처리가 끝난 URL의 매칭 결과 추가 (이전 실행에서 가져온 URL은 다시 기록하지 않음)"""
+        if url not in self._offsets:
+            self._append({'url': url, 'matches': matches})
+    
+    def _append(self, record: dict):
+        self._file.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+        # 프로세스가 갑자기 종료되어도 기록이 남도록 줄마다 내보냄
+        self._file.flush()
+    
+    def close(self, completed: bool = False):
+        """
+        파일 닫기
+        
+        Args:
+            completed: 모든 URL 처리가 끝났으면 True (체크포인트 파일 삭제)
+        """
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            if completed:
+                os.remove(self.path)
+
+
+class ResultSink(ABC):
+    """
+    URL별 매칭 결과를 처리가 끝나는 대로 기록하는 출력 대상의 기본 클래스
+    
+    하위 클래스는 _write에서 URL 하나의 결과를 기록합니다.
+    파일 출력은 FLUSH_INTERVAL초마다 디스크로 내보내므로 실행이 중간에 중단되어도
+    그때까지의 결과가 파일에 남습니다.
+    """
+    
+    FLUSH_INTERVAL = 2.0
+    
+    def __init__(self, filepath: str = None, encoding: str = 'utf-8', newline: str = None):
+        self.filepath = filepath
+        self.url_count = 0
+        self.match_count = 0
+        self._file = open(filepath, 'w', encoding=encoding, newline=newline) if filepath else None
+        self._last_flush = time.monotonic()
+    
+    def write(self, url: str, matches: List[Tuple[int, str, str]]):
+        """URL 하나의 매칭 결과 기록"""
+        self._write(url, matches)
+        self.url_count += 1
+        self.match_count += len(matches)
+        if self._file is not None and time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+            self._file.flush()
+            self._last_flush = time.monotonic()
+    
+    @abstractmethod
+    def _write(self, url: str, matches: List[Tuple[int, str, str]]):
+        """URL 하나의 매칭 결과를 출력 대상에 기록 (하위 클래스에서 구현)"""
+    
+    def close(self):
+        """남은 내용을 기록하고 파일 닫기"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ConsoleResultSink(ResultSink):
+    """매칭 결과를 콘솔에 출력"""
+    
+    def _write(self, url: str, matches: List[Tuple[int, str, str]]):
+        print(f"\n📄 URL: {url}")
+        print(f"   매칭 수: {len(matches)}")
+        print("-" * 80)
+        
+        for line_num, keyword, line in matches:
+            # 키워드 표시
+            keyword_display = f"[{keyword}]" if len(keyword) < 30 else f"[{keyword[:27]}...]"
+            # 줄 번호와 키워드 표시
+            print(f"  줄 {line_num:5d} | 키워드: {keyword_display}")
+            # 매칭된 줄 전체 출력
+            print(f"  내용: {line}")
+            print()
+    
+    def close(self):
+        print("\n" + "=" * 80)
+        print("검색 결과")
+        print("=" * 80 + "\n")
+        
+        if not self.url_count:
+            print("매칭되는 내용이 없습니다.")
+            return
+        
+        print(f"총 {self.url_count}개 URL에서 {self.match_count}개의 매칭을 발견했습니다.")
+        print("=" * 80)
+
+
+class TextResultSink(ResultSink):
+    """매칭 결과를 텍스트 파일로 저장"""
+    
+    def __init__(self, filepath: str):
+        super().__init__(filepath)
+        self._file.write("웹 페이지 키워드 필터링 결과\n")
+        self._file.write("=" * 80 + "\n\n")
+    
+    def _write(self, url: str, matches: List[Tuple[int, str, str]]):
+        f = self._file
+        f.write(f"URL: {url}\n")
+        f.write(f"매칭 수: {len(matches)}\n")
+        f.write("-" * 80 + "\n")
+        
+        for line_num, keyword, line in matches:
+            f.write(f"줄 {line_num} | 키워드: {keyword}\n")
+            f.write(f"내용: {line}\n\n")
+        
+        f.write("\n")
+    
+    def close(self):
+        super().close()
+        print(f"\n✓ 결과가 '{self.filepath}'에 저장되었습니다.")
+
+
+class CsvResultSink(ResultSink):
+    """매칭 결과를 CSV 파일로 저장 (utf-8-sig: Excel 호환)"""
+    
+    HEADER = ['URL', '줄번호', '키워드', '매칭내용']
+    
+    def __init__(self, filepath: str):
+        super().__init__(filepath, encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file, lineterminator=os.linesep)
+        self._writer.writerow(self.HEADER)
+    
+    def _write(self, url: str, matches: List[Tuple[int, str, str]]):
+        self._writer.writerows((url, line_num, keyword, line) for line_num, keyword, line in matches)
+    
+    def close(self):
+        super().close()
+        if self.match_count:
+            print(f"\n✓ CSV 결과가 '{self.filepath}'에 저장되었습니다.")
+            print(f"  총 {self.match_count}개의 매칭이 저장되었습니다.")
+        else:
+            # 헤더만 있는 파일은 남기지 않음
+            os.remove(self.filepath)
+            print(f"\n⚠️  저장할 데이터가 없습니다.")
+
+
+class JsonlResultSink(ResultSink):
+    """매칭 결과를 JSON Lines 파일로 저장 (매칭 하나당 한 줄)"""
+    
+    def _write(self, url: str, matches: List[Tuple[int, str, str]]):
+        for line_num, keyword, line in matches:
+            record = {'url': url, 'line_num': line_num, 'keyword': keyword, 'line': line}
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    
+    def close(self):
+        super().close()
+        print(f"\n✓ JSON Lines 결과가 '{self.filepath}'에 저장되었습니다.")
+
+
+class ArrowResultSink(ResultSink):
+    """
+    매칭 결과를 Parquet 또는 Arrow IPC(.arrow/.feather) 파일로 저장 (pyarrow 필요)
+    
+    BATCH_ROWS개씩 모아서 하나의 레코드 배치(Parquet row group)로 기록하므로
+    메모리 사용량은 배치 크기로 제한됩니다.
+    """
+    
+    BATCH_ROWS = 10000
+    
+    def __init__(self, filepath: str):
+        # pyarrow는 무거우므로 컬럼 형식 출력을 요청한 경우에만 import
+        import pyarrow as pa
+        
+        super().__init__()
+        self.filepath = filepath
+        self._pa = pa
+        self._schema = pa.schema([
+            ('URL', pa.string()),
+            ('줄번호', pa.int64()),
+            ('키워드', pa.string()),
+            ('매칭내용', pa.string()),
+        ])
+        if filepath.lower().endswith(('.arrow', '.feather', '.ipc')):
+            import pyarrow.ipc
+            self._writer = pa.ipc.new_file(filepath, self._schema)
+        else:
+            import pyarrow.parquet
+            self._writer = pa.parquet.ParquetWriter(filepath, self._schema)
+        self._rows: List[Tuple[str, int, str, str]] = []
+    
+    def _write(self, url: str, matches: List[Tuple[int, str, str]]):
+        self._rows.extend((url, line_num, keyword, line) for line_num, keyword, line in matches)
+        if len(self._rows) >= self.BATCH_ROWS:
+            self._flush_rows()
+    
+    def _flush_rows(self):
+        if not self._rows:
+            return
+        columns = list(zip(*self._rows))
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema))
+        self._rows = []
+    
+    def close(self):
+        self._flush_rows()
+        self._writer.close()
+        print(f"\n✓ 컬럼 형식 결과가 '{self.filepath}'에 저장되었습니다.")
+        print(f"  총 {self.match_count}개의 매칭이 저장되었습니다.")
+
+
+def _compile_keyword(keyword: str, is_regex: bool) -> re.Pattern:
+    """키워드를 검색 패턴으로 컴파일 (일반 키워드는 대소문자를 무시하는 문자열 검색)"""
+    return re.compile(keyword if is_regex else re.escape(keyword), re.IGNORECASE)
+
+
+def _first_match(keywords: List[Tuple[str, bool, re.Pattern]], matcher: Optional[KeywordMatcher],
+                 line: str) -> Optional[int]:
+    """줄에 매칭되는 첫 번째 키워드의 위치 (매칭이 없으면 None)"""
+    if matcher is not None and matcher.prefiltered:
+        return matcher.match(line)
+    for idx, (keyword, is_regex, pattern) in enumerate(keywords):
+        if pattern.search(line):
+            return idx  # 하나의 줄에 대해 첫 번째 매칭만 기록
+    return None
+
+
+# 매칭 워커 프로세스의 (키워드 목록, 매칭 엔진). _init_match_worker에서 한 번만 생성
+_match_worker_state = None
+
+
+def _init_match_worker(sources: List[Tuple[str, bool]], combined: bool):
+    """매칭 워커 프로세스 초기화: 키워드 원본으로 패턴과 매칭 엔진을 미리 컴파일"""
+    global _match_worker_state
+    keywords = [(keyword, is_regex, _compile_keyword(keyword, is_regex)) for keyword, is_regex in sources]
+    _match_worker_state = (keywords, KeywordMatcher(keywords) if combined else None)
+
+
+def _attach_shared_memory(name: str):
+    """
+    부모 프로세스가 만든 공유 메모리에 연결 (resource tracker에는 등록하지 않음)
+    
+    공유 메모리는 만든 부모 프로세스가 소유하고 unlink합니다. 워커가 등록하면 tracker가
+    부모의 등록과 구분하지 못해 unlink 후 정리 과정에서 오류를 내거나 세그먼트를 먼저 지웁니다.
+    """
+    from multiprocessing import resource_tracker, shared_memory
+    
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13 이상
+    except TypeError:
+        pass
+    # 이전 버전은 연결할 때도 등록하므로 등록 함수를 잠시 바꿔서 연결
+    # (워커 프로세스는 작업을 한 스레드에서 하나씩 실행)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _match_worker_scan(shm_name: str, start: int, end: int,
+                       first_line_num: int) -> Tuple[List[Tuple[int, int, str]], Dict[str, int]]:
+    """
+    공유 메모리에 있는 본문 구간의 줄을 검색 (매칭 워커 프로세스에서 실행)
+    
+    Returns:
+        ((줄 번호, 키워드 위치, 줄 내용) 튜플 목록, 이 구간의 사전 필터 통계) 튜플
+    """
+    keywords, matcher = _match_worker_state
+    shm = _attach_shared_memory(shm_name)
+    try:
+        with shm.buf[start:end] as view:
+            text = str(view, 'utf-8', 'surrogatepass')
+    finally:
+        shm.close()
+    
+    before = matcher.stats if matcher is not None else {}
+    matches = []
+    for line_num, line in enumerate(text.split('\n'), first_line_num):
+        line_stripped = line.strip()
+        if not line_stripped:
+            continue
+        idx = _first_match(keywords, matcher, line)
+        if idx is not None:
+            matches.append((line_num, idx, line_stripped))
+    after = matcher.stats if matcher is not None else {}
+    return matches, {name: after[name] - before[name] for name in after}
+
+
+class MatchPool:
+    """
+    정리된 페이지의 키워드 검색을 여러 프로세스에서 수행하는 매칭 단계
+    
+    정규식 키워드가 많으면 검색은 CPU를 쓰는 작업이라 스레드로는 GIL 때문에 코어 하나만 사용됩니다.
+    워커 프로세스는 시작할 때 키워드 원본으로 매칭 엔진을 한 번만 컴파일해 두고,
+    페이지 본문은 공유 메모리로 넘기므로 작업마다 키워드나 본문을 pickle하지 않습니다.
+    큰 페이지는 줄 경계에서 나누어 여러 프로세스가 동시에 검색합니다.
+    
+    워커는 가져오기 스레드에서 필요할 때 시작되므로 fork 대신 spawn으로 만듭니다.
+    다른 스레드가 잠금을 잡고 있는 동안 fork되면 워커가 그 잠금에서 멈출 수 있습니다.
+    """
+    
+    # 이보다 작은 페이지는 나누지 않고 프로세스 하나에서 검색 (바이트)
+    MIN_SPLIT_BYTES = 256 * 1024
+    
+    def __init__(self, keywords: List[Tuple[str, bool, re.Pattern]], processes: int,
+                 combined: bool = True):
+        """
+        Args:
+            keywords: _load_keywords가 반환한 (원본 키워드, 정규식 여부, 패턴) 목록
+            processes: 매칭 워커 프로세스 수
+            combined: 워커에서 KeywordMatcher(통합 패턴)를 사용할지 여부
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        
+        self.processes = processes
+        # 워커 프로세스에서 모은 사전 필터 통계 (KeywordMatcher.stats와 같은 항목)
+        self.stats: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        sources = [(keyword, is_regex) for keyword, is_regex, _ in keywords]
+        self._executor = ProcessPoolExecutor(max_workers=processes,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_match_worker, initargs=(sources, combined))
+    
+    def scan(self, lines: Iterable[str]) -> List[Tuple[int, int, str]]:
+        """
+        줄에서 키워드 검색 (WebLineFilter._scan_lines와 같은 결과)
+        
+        Returns:
+            List of (줄 번호, 키워드 위치, 줄 내용) 튜플
+        """
+        from multiprocessing import shared_memory
+        
+        data = '\n'.join(lines).encode('utf-8', 'surrogatepass')
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        try:
+            shm.buf[:len(data)] = data
+            futures = [self._executor.submit(_match_worker_scan, shm.name, start, end, line_num)
+                       for start, end, line_num in self._split(data)]
+            matches = []
+            for future in futures:
+                part, stats = future.result()
+                matches.extend(part)
+                with self._stats_lock:
+                    for name, value in stats.items():
+                        self.stats[name] = self.stats.get(name, 0) + value
+            return matches
+        finally:
+            shm.close()
+            shm.unlink()
+    
+    def _split(self, data: bytes) -> List[Tuple[int, int, int]]:
+        """본문을 줄 경계에서 프로세스 수만큼 나눈 (시작, 끝, 첫 줄 번호) 목록"""
+        parts = min(self.processes, max(1, len(data) // self.MIN_SPLIT_BYTES))
+        ranges = []
+        start, line_num = 0, 1
+        for part in range(1, parts):
+            end = data.find(b'\n', max(start, len(data) * part // parts))
+            if end == -1:
+                break
+            ranges.append((start, end, line_num))
+            line_num += data.count(b'\n', start, end) + 1
+            start = end + 1
+        ranges.append((start, len(data), line_num))
+        return ranges
+    
+    def close(self):
+        """워커 프로세스 종료"""
+        self._executor.shutdown(cancel_futures=True)
+
 
 class WebLineFilter:
-    def __init__(self, urls_file: str, keywords_file: str):
+    # 응답 본문을 읽는 조각 크기 (바이트)
+    CHUNK_SIZE = 64 * 1024
+    
+    def __init__(self, urls_file: str, keywords_file: str, workers: int = 1, per_host: int = 4,
+                 pool_size: int = None, retries: int = 2, backoff: float = 0.5,
+                 matcher: str = 'combined', cache_dir: str = None, cache_ttl: float = 3600,
+                 cache_max_mb: int = 512, incremental: bool = False, match_procs: int = 0,
+                 rate: float = 0.0, metrics: bool = False, checkpoint: str = None,
+                 resume: bool = False):
         """
         초기화
         
         Args:
             urls_file: URL 목록이 저장된 파일 경로
             keywords_file: 키워드 목록이 저장된 파일 경로
+            workers: 동시에 가져올 페이지 수 (1이면 순차 처리)
+            per_host: 호스트 하나에 동시에 보낼 수 있는 최대 요청 수 (응답 상태에 따라 자동으로 줄어듦)
+            pool_size: 호스트별로 유지할 keep-alive 연결 수 (기본값: per_host)
+            retries: 연결 오류 및 5xx/429 응답에 대한 재시도 횟수
+            backoff: 재시도 간 지수 백오프 계수 (초)
+            matcher: 키워드 매칭 방식 ('combined': 통합 패턴, 'legacy': 키워드별 반복 검사)
+            cache_dir: 응답 캐시 디렉터리 (None이면 캐시 사용 안 함)
+            cache_ttl: 캐시 항목을 재검증 없이 사용할 시간 (초)
+            cache_max_mb: 캐시 최대 크기 (MB)
+            incremental: 이전 실행의 매칭 결과를 재사용하여 바뀐 키워드/페이지만 검사 (캐시 필요)
+            match_procs: 키워드 검색을 수행할 프로세스 수 (0이면 워커 스레드에서 직접 검색)
+            rate: 호스트당 초당 최대 요청 수 (0이면 제한 없음)
+            metrics: URL별 단계 시간(DNS/연결/TTFB/다운로드/정리/검색)과 크기를 측정할지 여부
+            checkpoint: 처리가 끝난 URL과 결과를 기록할 체크포인트 파일 경로
+            resume: 체크포인트 파일에 기록된 URL은 건너뛰고 기록된 결과를 사용
+                    (checkpoint가 없으면 '<urls_file>.checkpoint.jsonl')
         """
         self.urls = self._load_urls(urls_file)
         self.keywords = self._load_keywords(keywords_file)
+        self.matcher = KeywordMatcher(self.keywords) if matcher == 'combined' else None
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        
+        # 모든 요청이 공유하는 연결 풀 세션 (첫 요청 때 생성)
+        self.pool_size = max(1, pool_size or self.per_host)
+        self.retries = retries
+        self.backoff = backoff
+        
+        # 중단된 실행을 이어서 하기 위한 체크포인트
+        self.checkpoint = None
+        if checkpoint or resume:
+            path = checkpoint or f"{urls_file}.checkpoint.jsonl"
+            try:
+                self.checkpoint = CheckpointJournal(path, self.keywords, resume)
+            except OSError as e:
+                print(f"⚠️  체크포인트 파일을 열 수 없어 사용하지 않습니다: {e}")
+        
+        # URL별 측정값 (측정하지 않으면 None)
+        self.metrics = RunMetrics(self.urls) if metrics else None
+        
+        # 호스트별 요청 속도/동시 요청 수 조절 (429/503 재시도 포함)
+        self.scheduler = HostScheduler(self.per_host, rate=rate, retries=retries, backoff=backoff)
+        self._session = None
+        self._session_lock = threading.Lock()
         
+        # 디스크 응답 캐시와 정리된 텍스트 저장소
+        self.cache = None
+        self.text_store = None
+        if cache_dir:
+            self.cache = ResponseCache(cache_dir, ttl=cache_ttl, max_bytes=cache_max_mb * 1024 * 1024)
+            self.text_store = CleanedTextStore(os.path.join(cache_dir, 'text'))
+        
+        # 증분 검색 인덱스
+        self.match_index = None
+        if incremental:
+            if cache_dir:
+                self.match_index = MatchIndex(os.path.join(cache_dir, 'match_index.json'), self.keywords)
+            else:
+                print("⚠️  증분 검색은 응답 캐시(--cache-dir)가 필요하므로 사용하지 않습니다.")
+        
+        # 키워드 검색 프로세스 풀
+        self.match_pool = None
+        if match_procs > 0:
+            self.match_pool = MatchPool(self.keywords, match_procs, combined=self.matcher is not None)
+    
+    @property
+    def session(self) -> 'requests.Session':
+        """모든 요청이 공유하는 세션 (처음 사용할 때 생성)"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._build_session(self.retries, self.backoff)
+        return self._session
+    
+    def _build_session(self, retries: int, backoff: float) -> 'requests.Session':
+        """
+        호스트별 keep-alive 연결 풀과 재시도 정책이 적용된 세션 생성
+        
+        같은 호스트로 가는 요청은 풀에 남아 있는 연결을 재사용하므로
+        URL마다 TCP/TLS 핸드셰이크를 다시 하지 않습니다.
+        429/503 응답은 호스트 전체의 속도를 조절해야 하므로 여기서 재시도하지 않고
+        HostScheduler가 처리합니다.
+        """
+        requests = _requests()
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        retry = Retry(
+            total=max(0, retries),
+            backoff_factor=backoff,
+            status_forcelist=(500, 502, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False,
+            # Retry-After가 붙은 429/503도 urllib3가 직접 재시도하지 않도록 함
+            respect_retry_after_header=False,
+        )
+        adapter_options = dict(
+            pool_connections=max(10, len({urlparse(url).netloc.lower() for url in self.urls})),
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+            pool_block=False,
+        )
+        # 측정할 때만 DNS/연결 시간을 기록하는 연결 클래스 사용
+        adapter = _timed_adapter(**adapter_options) if self.metrics is not None else HTTPAdapter(**adapter_options)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Connection': 'keep-alive',
+        })
+        return session
+    
+    def close(self):
+        """세션과 풀에 남아 있는 연결, 매칭 프로세스를 정리하고 캐시 크기 제한 적용"""
+        if self._session is not None:
+            self._session.close()
+        if self.match_pool is not None:
+            self.match_pool.close()
+        if self.cache is not None:
+            self.cache.prune()
+    
     def _load_urls(self, filepath: str) -> List[str]:
         """URL 파일에서 URL 목록 로드"""
         try:
@@ -59,15 +1839,13 @@ class WebLineFilter:
                     if line.startswith('<<REGEX>>'):
                         regex_pattern = line[9:].strip()
                         try:
-                            compiled_pattern = re.compile(regex_pattern, re.IGNORECASE)
-                            keywords.append((regex_pattern, True, compiled_pattern))
+                            keywords.append((regex_pattern, True, _compile_keyword(regex_pattern, True)))
                         except re.error as e:
                             print(f"⚠️  경고: 잘못된 정규식 '{regex_pattern}': {e}")
                             continue
                     else:
                         # 일반 문자열 검색 (대소문자 무시)
-                        pattern = re.compile(re.escape(line), re.IGNORECASE)
-                        keywords.append((line, False, pattern))
+                        keywords.append((line, False, _compile_keyword(line, False)))
             
             print(f"✓ {len(keywords)}개의 키워드를 로드했습니다.")
             return keywords
@@ -99,169 +1877,418 @@ class WebLineFilter:
         
         return text
     
-    def _fetch_webpage(self, url: str) -> Tuple[str, List[str]]:
+    def _fetch_webpage(self, url: str, info: dict = None,
+                       slot: HostSlot = None) -> Tuple[str, Iterator[str]]:
         """
-        웹 페이지를 가져와서 HTML 태그를 제거하고 줄 단위로 분리
+        웹 페이지 요청을 보내고 HTML 태그를 제거한 줄을 차례로 내보내는 제너레이터 반환
+        
+        본문은 stream=True로 조각 단위로 읽으면서 바로 정리하므로 페이지 전체를
+        메모리에 올리지 않습니다. 본문을 읽는 도중의 네트워크 오류는 제너레이터를
+        소비하는 쪽에서 requests 예외로 전달됩니다.
+        
+        캐시를 사용하는 경우 TTL 이내의 항목은 요청 없이, 그 이후에는 조건부 GET으로
+        재검증하여 304 응답이면 저장된 본문을 사용합니다.
+        
+        Args:
+            info: 본문 해시('sha256')를 기록할 딕셔너리 (캐시 사용 시, 새로 받은 페이지는
+                  줄을 모두 소비한 뒤에 채워짐)
+            slot: 요청을 보내기 전에 얻을 호스트 슬롯 (None이면 스케줄링 없이 바로 요청)
         
         Returns:
-            (URL, 줄 목록) 튜플
+            (URL, 줄 제너레이터) 튜플. 요청이 실패하면 빈 목록
         """
+        if info is None:
+            info = {}
+        entry = self.cache.lookup(url) if self.cache is not None else None
+        metrics = _current_metrics()
+        if entry is not None and entry['fresh']:
+            self.cache.hit(url, entry)
+            info['sha256'] = entry.get('sha256')
+            if metrics is not None:
+                metrics.cache = 'fresh'
+            return url, self._cached_lines(url, entry)
+        
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            # HTML 태그 제거 및 <br> 태그를 개행으로 변환
-            cleaned_text = self._clean_html(response.text)
-            
-            # 텍스트를 줄 단위로 분리
-            lines = cleaned_text.split('\n')
-            return url, lines
-        except requests.exceptions.RequestException as e:
+            headers = ResponseCache.conditional_headers(entry) if entry is not None else None
+            if slot is None:
+                response = self._get(url, headers)
+            else:
+                response = self._scheduled_get(url, headers, slot)
+            if entry is not None and response.status_code == 304:
+                response.close()
+                self.cache.hit(url, entry, response)
+                info['sha256'] = entry.get('sha256')
+                if metrics is not None:
+                    metrics.cache = 'revalidated'
+                return url, self._cached_lines(url, entry)
+            try:
+                response.raise_for_status()
+            except _requests().exceptions.HTTPError:
+                # stream=True로 받은 응답은 본문을 읽지 않으면 연결이 풀에 반환되지 않음
+                response.close()
+                raise
+        except _requests().exceptions.RequestException as e:
             print(f"⚠️  URL '{url}' 가져오기 실패: {e}")
             return url, []
+        
+        chunks = self._iter_response(response)
+        if self.cache is None or response.status_code != 200:
+            return url, self._iter_lines(chunks, response.encoding)
+        chunks = self.cache.store(url, response, chunks, info)
+        return url, self.text_store.record(self._iter_lines(chunks, response.encoding), info)
+    
+    def _get(self, url: str, headers: Optional[dict]) -> 'requests.Response':
+        """요청을 보내고 응답 헤더까지 받음 (측정 중이면 DNS/연결을 제외한 첫 바이트까지의 시간 기록)"""
+        metrics = _current_metrics()
+        if metrics is None:
+            return self.session.get(url, timeout=10, stream=True, headers=headers)
+        before = metrics.dns + metrics.connect
+        started = time.perf_counter()
+        try:
+            return self.session.get(url, timeout=10, stream=True, headers=headers)
+        finally:
+            metrics.ttfb += time.perf_counter() - started - (metrics.dns + metrics.connect - before)
+    
+    def _scheduled_get(self, url: str, headers: Optional[dict], slot: HostSlot) -> 'requests.Response':
+        """호스트 슬롯을 얻은 뒤 요청 (429/503 응답은 스케줄러가 허용하는 만큼 재시도)"""
+        while True:
+            slot.acquire()
+            try:
+                response = self._get(url, headers)
+            except _requests().exceptions.RequestException:
+                slot.failed()
+                raise
+            if not slot.retry(response):
+                return response
+    
+    def _cached_lines(self, url: str, entry: dict) -> Iterator[str]:
+        """캐시된 페이지의 줄 반환 (정리된 텍스트가 있으면 HTML 정리 생략)"""
+        digest = entry.get('sha256')
+        if digest:
+            lines = self.text_store.open_lines(digest)
+            if lines is not None:
+                self.cache.touch(url)
+                return lines
+        lines = self._iter_lines(self.cache.iter_body(url, self.CHUNK_SIZE), entry.get('encoding'))
+        return self.text_store.record(lines, entry) if digest else lines
+    
+    def _iter_response(self, response: 'requests.Response') -> Iterator[bytes]:
+        """응답 본문을 조각 단위로 읽고 끝나면 연결을 풀에 반환"""
+        metrics = _current_metrics()
+        try:
+            if metrics is None:
+                yield from response.iter_content(chunk_size=self.CHUNK_SIZE)
+                return
+            chunks = response.iter_content(chunk_size=self.CHUNK_SIZE)
+            while True:
+                started = time.perf_counter()
+                chunk = next(chunks, None)
+                metrics.download += time.perf_counter() - started
+                if chunk is None:
+                    break
+                metrics.bytes += len(chunk)
+                yield chunk
+        finally:
+            response.close()
+    
+    def _iter_lines(self, chunks: Iterable[bytes], encoding: Optional[str]) -> Iterator[str]:
+        """본문 조각을 디코딩하면서 HTML을 정리한 줄을 내보냄"""
+        # 인코딩을 알 수 없으면 전체 본문으로 추측할 수 없으므로 UTF-8로 처리
+        decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+        tokenizer = HtmlLineTokenizer()
+        metrics = _current_metrics()
+        try:
+            for chunk in chunks:
+                started = time.perf_counter()
+                lines = tokenizer.feed(decoder.decode(chunk))
+                if metrics is not None:
+                    metrics.clean += time.perf_counter() - started
+                yield from lines
+            yield from tokenizer.feed(decoder.decode(b'', final=True))
+            yield from tokenizer.close()
+        finally:
+            # 중간에 소비가 멈춘 경우에도 응답/캐시 기록을 정리
+            if hasattr(chunks, 'close'):
+                chunks.close()
     
-    def _search_lines(self, url: str, lines: List[str]) -> List[Tuple[int, str, str]]:
+    def _search_lines(self, url: str, lines: Iterable[str]) -> List[Tuple[int, str, str]]:
         """
         줄에서 키워드 검색
         
         Returns:
             List of (줄 번호, 매칭된 키워드, 줄 내용) 튜플
         """
+        return [(line_num, self.keywords[idx][0], line)
+                for line_num, idx, line in self._scan_lines(lines)]
+    
+    def _match_line(self, line: str) -> Optional[int]:
+        """줄에 매칭되는 첫 번째 키워드의 위치 (매칭이 없으면 None)"""
+        return _first_match(self.keywords, self.matcher, line)
+    
+    def _scan_lines(self, lines: Iterable[str],
+                    previous: Dict[int, int] = None) -> List[Tuple[int, int, str]]:
+        """
+        줄에서 키워드 검색
+        
+        Args:
+            previous: 같은 본문에 대한 이전 실행의 {줄 번호: 키워드 위치} (증분 검색)
+        
+        Returns:
+            List of (줄 번호, 키워드 위치, 줄 내용) 튜플
+        """
+        if previous is None and self.match_pool is not None:
+            return self.match_pool.scan(lines)
+        
         matches = []
         for line_num, line in enumerate(lines, 1):
             line_stripped = line.strip()
             if not line_stripped:
                 continue
             
-            for keyword, is_regex, pattern in self.keywords:
-                if pattern.search(line):
-                    matches.append((line_num, keyword, line_stripped))
-                    break  # 하나의 줄에 대해 첫 번째 매칭만 기록
+            if previous is None:
+                idx = self._match_line(line)
+            else:
+                idx = previous.get(line_num)
+                if idx == MatchIndex.REMOVED:
+                    idx = self._match_line(line)
+                else:
+                    added = self.match_index.match_added(line)
+                    if added is not None and (idx is None or added < idx):
+                        idx = added
+            
+            if idx is not None:
+                matches.append((line_num, idx, line_stripped))
         
         return matches
     
-    def run(self, output_file: str = None, csv_file: str = None):
+    def _process_url(self, url: str) -> Tuple[str, Optional[List[Tuple[int, str, str]]]]:
+        """
+        URL 하나를 가져와서 바로 키워드 검색까지 수행 (워커 스레드에서 실행)
+        
+        측정 중이면 처리하는 동안 URL별 측정값을 기록합니다.
+        
+        Returns:
+            (URL, 매칭 목록) 튜플. 페이지를 가져오지 못한 경우 매칭 목록은 None
+        """
+        if self.metrics is None:
+            return self._fetch_and_search(url)
+        
+        metrics = UrlMetrics(url)
+        _metrics_local.url = metrics
+        started = time.perf_counter()
+        matches = None
+        try:
+            url, matches = self._fetch_and_search(url)
+        finally:
+            _metrics_local.url = None
+            metrics.total = time.perf_counter() - started
+            # 검색 시간은 본문을 읽으면서 진행되므로 전체 시간에서 다른 단계를 빼서 계산
+            other = sum(getattr(metrics, stage) for stage in UrlMetrics.STAGES if stage not in ('match', 'total'))
+            metrics.match = max(0.0, metrics.total - other)
+            metrics.ok = matches is not None
+            metrics.matches = len(matches or ())
+            self.metrics.add(metrics)
+        return url, matches
+    
+    def _fetch_and_search(self, url: str) -> Tuple[str, Optional[List[Tuple[int, str, str]]]]:
+        """URL 하나를 가져와서 키워드 검색 (_process_url 참고)"""
+        info = {}
+        with self.scheduler.slot(url) as slot:
+            url, lines = self._fetch_webpage(url, info, slot)
+            if not lines:
+                return url, None
+            metrics = _current_metrics()
+            if metrics is not None:
+                lines = self._count_lines(lines, metrics)
+            # 본문은 검색하면서 내려받으므로 검색이 끝날 때까지 호스트 슬롯을 유지
+            try:
+                if self.match_index is None:
+                    return url, self._search_lines(url, lines)
+                if 'sha256' not in info:
+                    # 새로 받은 페이지는 본문을 끝까지 읽어야 해시를 알 수 있으므로 정리한 줄을
+                    # 먼저 모은 뒤 이전 결과를 찾음 (본문이 같으면 다시 받아도 전체 검색 생략)
+                    lines = list(lines)
+                previous = self.match_index.previous(info.get('sha256'))
+                matches = self._scan_lines(lines, previous)
+            except _requests().exceptions.RequestException as e:
+                print(f"⚠️  URL '{url}' 가져오기 실패: {e}")
+                return url, None
+        
+        self.match_index.record(info.get('sha256'), matches, reused=previous is not None)
+        return url, [(line_num, self.keywords[idx][0], line) for line_num, idx, line in matches]
+    
+    @staticmethod
+    def _count_lines(lines: Iterable[str], metrics: UrlMetrics) -> Iterator[str]:
+        """줄을 그대로 내보내면서 줄 수 기록"""
+        for line in lines:
+            metrics.lines += 1
+            yield line
+    
+    def _iter_results(self) -> Iterator[Tuple[int, str, Optional[List[Tuple[int, str, str]]]]]:
+        """
+        모든 URL을 처리하고 결과를 입력 순서대로 반환
+        
+        workers가 1이면 순차 처리하고, 그보다 크면 스레드 풀에서 동시에
+        가져오되 결과는 항상 URL 파일의 순서를 유지합니다.
+        체크포인트에 기록된 URL은 다시 가져오지 않고 기록된 결과를 반환합니다.
+        """
+        checkpoint = self.checkpoint
+        if self.workers == 1:
+            for idx, url in enumerate(self.urls, 1):
+                if checkpoint is not None and checkpoint.done(url):
+                    yield idx, url, checkpoint.load(url)
+                else:
+                    yield (idx,) + self._process_url(url)
+            return
+        
+        # concurrent.futures는 logging까지 불러오므로 동시 처리할 때만 import
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {idx: executor.submit(self._process_url, url) for idx, url in enumerate(self.urls, 1)
+                       if checkpoint is None or not checkpoint.done(url)}
+            try:
+                for idx, url in enumerate(self.urls, 1):
+                    future = futures.get(idx)
+                    if future is None:
+                        yield idx, url, checkpoint.load(url)
+                    else:
+                        yield (idx,) + future.result()
+            finally:
+                # 중단된 경우 아직 시작하지 않은 작업은 취소
+                for future in futures.values():
+                    future.cancel()
+    
+    def run(self, output_file: str = None, csv_file: str = None, jsonl_file: str = None,
+            arrow_file: str = None, metrics_file: str = None):
         """
         메인 실행 함수
         
+        결과는 URL 하나의 처리가 끝날 때마다 콘솔과 각 파일에 바로 기록되므로
+        전체 결과를 메모리에 모아두지 않으며, 중간에 중단되어도 그때까지의 결과가 남습니다.
+        
         Args:
             output_file: 결과를 저장할 텍스트 파일 경로 (선택사항)
             csv_file: 결과를 저장할 CSV 파일 경로 (선택사항)
+            jsonl_file: 결과를 저장할 JSON Lines 파일 경로 (선택사항)
+            arrow_file: 결과를 저장할 Parquet/Arrow 파일 경로 (선택사항, pyarrow 필요)
+            metrics_file: URL별 측정값을 저장할 파일 경로 (.prom이면 Prometheus 형식, 그 외 JSON)
         """
         print("\n" + "=" * 80)
         print("웹 페이지 키워드 필터링 시작")
         print("=" * 80 + "\n")
         
-        all_results = []
+        if self.workers > 1:
+            print(f"동시 처리: 워커 {self.workers}개, 호스트당 최대 {self.per_host}개 요청\n")
+        if self.scheduler.rate:
+            print(f"요청 속도 제한: 호스트당 초당 {self.scheduler.rate:g}개\n")
+        if self.match_pool is not None:
+            print(f"키워드 검색: 프로세스 {self.match_pool.processes}개\n")
+        if self.match_index is not None:
+            print(f"증분 검색: 추가된 키워드 {len(self.match_index.added)}개, "
+                  f"삭제된 키워드 {self.match_index.removed}개\n")
         
-        for idx, url in enumerate(self.urls, 1):
-            print(f"[{idx}/{len(self.urls)}] 처리 중: {url}")
-            
-            url, lines = self._fetch_webpage(url)
-            if not lines:
-                continue
-            
-            matches = self._search_lines(url, lines)
-            
-            if matches:
-                print(f"  ✓ {len(matches)}개의 매칭 발견\n")
-                all_results.append((url, matches))
+        if self.checkpoint is not None:
+            if self.checkpoint.resumed:
+                print(f"체크포인트: 이전 실행에서 끝난 URL {self.checkpoint.resumed}개는 기록된 결과를 사용합니다.\n")
             else:
-                print(f"  - 매칭 없음\n")
+                print(f"체크포인트: 처리가 끝난 URL을 '{self.checkpoint.path}'에 기록합니다.\n")
         
-        # 결과 출력
-        self._display_results(all_results)
+        sinks = self._open_sinks(output_file, csv_file, jsonl_file, arrow_file)
         
-        # 파일로 저장 (선택사항)
-        if output_file:
-            self._save_results(all_results, output_file)
+        completed = False
+        try:
+            for idx, url, matches in self._iter_results():
+                if self.checkpoint is not None and self.checkpoint.done(url):
+                    print(f"[{idx}/{len(self.urls)}] 이전 실행 결과 사용: {url}")
+                else:
+                    print(f"[{idx}/{len(self.urls)}] 처리 중: {url}")
+                
+                if matches is None:
+                    continue
+                if self.checkpoint is not None:
+                    self.checkpoint.record(url, matches)
+                
+                if matches:
+                    print(f"  ✓ {len(matches)}개의 매칭 발견")
+                    for sink in sinks:
+                        sink.write(url, matches)
+                else:
+                    print(f"  - 매칭 없음\n")
+            completed = True
+        finally:
+            self.close()
+            for sink in sinks:
+                sink.close()
+            if self.checkpoint is not None:
+                # 끝까지 처리했으면 체크포인트가 더 필요 없음 (실패한 URL은 다시 실행해도 처음부터 시도)
+                self.checkpoint.close(completed=completed)
         
-        # CSV 파일로 저장 (선택사항)
-        if csv_file:
-            self._save_results_to_csv(all_results, csv_file)
+        self._print_host_summary()
+        if self.metrics is not None:
+            self.metrics.print_summary()
+            if metrics_file:
+                self.metrics.save(metrics_file)
+        self._print_prefilter_summary()
+        if self.cache is not None:
+            stats = self.cache.stats
+            print(f"캐시: 요청 생략 {stats['fresh']}개, 304 재검증 {stats['revalidated']}개, "
+                  f"새로 저장 {stats['stored']}개, "
+                  f"정리된 텍스트 재사용 {self.text_store.stats['reused']}개\n")
+        if self.match_index is not None:
+            self.match_index.save()
+            print(f"증분 검색: 이전 결과 재사용 {self.match_index.stats['reused']}개, "
+                  f"전체 검색 {self.match_index.stats['rescanned']}개 페이지\n")
     
-    def _display_results(self, results: List[Tuple[str, List[Tuple[int, str, str]]]]):
-        """결과를 콘솔에 출력"""
-        print("\n" + "=" * 80)
-        print("검색 결과")
-        print("=" * 80 + "\n")
-        
-        if not results:
-            print("매칭되는 내용이 없습니다.")
+    def _print_prefilter_summary(self):
+        """사전 필터가 정규식 검사 없이 걸러낸 줄 수 출력"""
+        if (self.matcher is None or not self.matcher.prefiltered
+                or not any(is_regex for _, is_regex, _ in self.keywords)):
             return
-        
-        total_matches = 0
-        for url, matches in results:
-            total_matches += len(matches)
-            print(f"\n📄 URL: {url}")
-            print(f"   매칭 수: {len(matches)}")
-            print("-" * 80)
-            
-            for line_num, keyword, line in matches:
-                # 키워드 표시
-                keyword_display = f"[{keyword}]" if len(keyword) < 30 else f"[{keyword[:27]}...]"
-                # 줄 번호와 키워드 표시
-                print(f"  줄 {line_num:5d} | 키워드: {keyword_display}")
-                # 매칭된 줄 전체 출력
-                print(f"  내용: {line}")
-                print()
-        
-        print("\n" + "=" * 80)
-        print(f"총 {len(results)}개 URL에서 {total_matches}개의 매칭을 발견했습니다.")
-        print("=" * 80)
+        stats = dict(self.matcher.stats)
+        if self.match_pool is not None:
+            for name, value in self.match_pool.stats.items():
+                stats[name] += value
+        if not stats['lines']:
+            return
+        print(f"사전 필터: 검사한 {stats['lines']}줄 중 {stats['rejected']}줄은 정규식 검사 없이 제외 "
+              f"({stats['rejected'] / stats['lines']:.1%}), 정규식 검사 {stats['regex_runs']}회")
+        unfiltered = self.matcher.unfiltered
+        if unfiltered:
+            print(f"  필수 문자열을 찾을 수 없어 모든 줄에서 검사하는 키워드 {len(unfiltered)}개: "
+                  f"{', '.join(unfiltered[:5])}{' ...' if len(unfiltered) > 5 else ''}")
+        print()
     
-    def _save_results(self, results: List[Tuple[str, List[Tuple[int, str, str]]]], filepath: str):
-        """결과를 파일로 저장"""
-        try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write("웹 페이지 키워드 필터링 결과\n")
-                f.write("=" * 80 + "\n\n")
-                
-                for url, matches in results:
-                    f.write(f"URL: {url}\n")
-                    f.write(f"매칭 수: {len(matches)}\n")
-                    f.write("-" * 80 + "\n")
-                    
-                    for line_num, keyword, line in matches:
-                        f.write(f"줄 {line_num} | 키워드: {keyword}\n")
-                        f.write(f"내용: {line}\n\n")
-                    
-                    f.write("\n")
-            
-            print(f"\n✓ 결과가 '{filepath}'에 저장되었습니다.")
-        except Exception as e:
-            print(f"⚠️  파일 저장 오류: {e}")
+    def _print_host_summary(self):
+        """호스트별 요청 수, 제한 응답, 응답 시간, 동시 요청 한도 출력"""
+        rows = self.scheduler.summary()
+        if not rows:
+            return
+        print("호스트별 요청:")
+        for row in rows:
+            latency = '-' if row['avg_latency'] is None else f"{row['avg_latency']:.2f}s"
+            print(f"  {row['host']}: 요청 {row['requests']}개, 제한 응답(429/503) {row['throttled']}개, "
+                  f"오류 {row['errors']}개, 평균 응답 {latency}, 대기 {row['waited']:.1f}s, "
+                  f"동시 요청 한도 {row['limit']} (최소 {row['min_limit']})")
+        print()
     
-    def _save_results_to_csv(self, results: List[Tuple[str, List[Tuple[int, str, str]]]], filepath: str):
-        """결과를 CSV 파일로 저장 (pandas DataFrame 사용)"""
-        try:
-            # DataFrame용 데이터 준비
-            data = []
-            for url, matches in results:
-                for line_num, keyword, line in matches:
-                    data.append({
-                        'URL': url,
-                        '줄번호': line_num,
-                        '키워드': keyword,
-                        '매칭내용': line
-                    })
-            
-            # DataFrame 생성
-            if data:
-                df = pd.DataFrame(data)
-                
-                # CSV 파일로 저장
-                df.to_csv(filepath, index=False, encoding='utf-8-sig')  # utf-8-sig: Excel 호환성
-                
-                print(f"\n✓ CSV 결과가 '{filepath}'에 저장되었습니다.")
-                print(f"  총 {len(df)}개의 매칭이 저장되었습니다.")
-            else:
-                print(f"\n⚠️  저장할 데이터가 없습니다.")
-        except Exception as e:
-            print(f"⚠️  CSV 파일 저장 오류: {e}")
+    def _open_sinks(self, output_file: str = None, csv_file: str = None,
+                    jsonl_file: str = None, arrow_file: str = None) -> List['ResultSink']:
+        """콘솔과 요청된 파일 출력 대상 생성 (열 수 없는 파일은 경고 후 제외)"""
+        sinks: List[ResultSink] = [ConsoleResultSink()]
+        for sink_class, filepath in ((TextResultSink, output_file),
+                                     (CsvResultSink, csv_file),
+                                     (JsonlResultSink, jsonl_file),
+                                     (ArrowResultSink, arrow_file)):
+            if not filepath:
+                continue
+            try:
+                sinks.append(sink_class(filepath))
+            except ImportError:
+                print(f"⚠️  pyarrow가 설치되어 있지 않아 '{filepath}' 저장을 건너뜁니다. (pip install pyarrow)")
+            except OSError as e:
+                print(f"⚠️  파일 저장 오류: {e}")
+        return sinks
 
 
 def main():
@@ -274,6 +2301,15 @@ def main():
   python web_filter.py urls.txt keywords.txt -o results.txt
   python web_filter.py urls.txt keywords.txt -c results.csv
   python web_filter.py urls.txt keywords.txt -o results.txt -c results.csv
+  python web_filter.py urls.txt keywords.txt -j results.jsonl
+  python web_filter.py urls.txt keywords.txt --arrow results.parquet
+  python web_filter.py urls.txt keywords.txt -w 16 --per-host 4
+  python web_filter.py urls.txt keywords.txt -w 16 --per-host 4 --rate 2
+  python web_filter.py urls.txt keywords.txt --cache-dir .cache --cache-ttl 600
+  python web_filter.py urls.txt keywords.txt --cache-dir .cache --incremental
+  python web_filter.py urls.txt keywords.txt -w 8 --match-procs 4
+  python web_filter.py urls.txt keywords.txt --metrics metrics.json
+  python web_filter.py urls.txt keywords.txt -c results.csv --resume
 
 파일 형식:
   urls.txt      - 한 줄에 하나의 URL
@@ -290,12 +2326,56 @@ def main():
     parser.add_argument('keywords_file', help='키워드 목록이 저장된 파일')
     parser.add_argument('-o', '--output', help='결과를 저장할 텍스트 파일 경로', default=None)
     parser.add_argument('-c', '--csv', help='결과를 저장할 CSV 파일 경로', default=None)
+    parser.add_argument('-j', '--jsonl', help='결과를 저장할 JSON Lines 파일 경로', default=None)
+    parser.add_argument('--arrow', default=None,
+                        help='결과를 저장할 Parquet 파일 경로 (.arrow/.feather는 Arrow IPC, pyarrow 필요)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='동시에 가져올 페이지 수 (기본값: 1, 순차 처리)')
+    parser.add_argument('--per-host', type=int, default=4,
+                        help='호스트 하나에 동시에 보낼 최대 요청 수, 응답 상태에 따라 자동 조절 (기본값: 4)')
+    parser.add_argument('--rate', type=float, default=0,
+                        help='호스트당 초당 최대 요청 수 (기본값: 0, 제한 없음)')
+    parser.add_argument('--pool-size', type=int, default=None,
+                        help='호스트별 keep-alive 연결 풀 크기 (기본값: --per-host 값)')
+    parser.add_argument('--retries', type=int, default=2,
+                        help='연결 오류/5xx/429 응답 재시도 횟수 (기본값: 2)')
+    parser.add_argument('--backoff', type=float, default=0.5,
+                        help='재시도 지수 백오프 계수, 초 단위 (기본값: 0.5)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='응답 캐시 디렉터리 (지정하면 캐시 사용, 기본값: 사용 안 함)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='--cache-dir을 지정해도 응답 캐시를 사용하지 않음')
+    parser.add_argument('--cache-ttl', type=float, default=3600,
+                        help='캐시를 재검증 없이 사용할 시간, 초 단위 (기본값: 3600)')
+    parser.add_argument('--cache-max-mb', type=int, default=512,
+                        help='캐시 최대 크기, MB 단위 (기본값: 512)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='이전 실행의 매칭 결과를 재사용하여 추가/삭제된 키워드와 바뀐 페이지만 검사')
+    parser.add_argument('--matcher', choices=['combined', 'legacy'], default='combined',
+                        help='키워드 매칭 방식: combined(통합 패턴, 기본값) 또는 legacy(키워드별 검사)')
+    parser.add_argument('--metrics', default=None, metavar='FILE',
+                        help='URL별 단계 시간과 히스토그램을 저장할 파일 (.prom이면 Prometheus 텍스트, 그 외 JSON)')
+    parser.add_argument('--checkpoint', default=None, metavar='FILE',
+                        help='처리가 끝난 URL과 결과를 기록할 체크포인트 파일 (중단 후 --resume으로 이어서 실행)')
+    parser.add_argument('--resume', action='store_true',
+                        help='체크포인트에 기록된 URL은 건너뛰고 기록된 결과를 출력에 포함 '
+                             '(기본 경로: <urls_file>.checkpoint.jsonl)')
+    parser.add_argument('--match-procs', type=int, default=0,
+                        help='키워드 검색을 수행할 프로세스 수 (기본값: 0, 워커 스레드에서 검색)')
     
     args = parser.parse_args()
     
     # 필터 실행
-    filter_tool = WebLineFilter(args.urls_file, args.keywords_file)
-    filter_tool.run(args.output, args.csv)
+    filter_tool = WebLineFilter(args.urls_file, args.keywords_file,
+                                workers=args.workers, per_host=args.per_host,
+                                pool_size=args.pool_size, retries=args.retries,
+                                backoff=args.backoff, matcher=args.matcher,
+                                cache_dir=None if args.no_cache else args.cache_dir,
+                                cache_ttl=args.cache_ttl, cache_max_mb=args.cache_max_mb,
+                                incremental=args.incremental, match_procs=args.match_procs,
+                                rate=args.rate, metrics=bool(args.metrics),
+                                checkpoint=args.checkpoint, resume=args.resume)
+    filter_tool.run(args.output, args.csv, args.jsonl, args.arrow, args.metrics)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+web_filter.py 성능 측정 도구
+현재 작업 트리의 web_filter.py와 git의 다른 커밋을 같은 조건으로 측정하여 비교합니다.
+"""
+
+import os
+import sys
+import json
+import random
+import string
+import argparse
+import threading
+import subprocess
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from statistics import median
+from typing import Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 자식 프로세스에서 web_filter를 import하고 소요 시간, 최대 RSS, 로드된 무거운 모듈을 출력
+STARTUP_CHILD = r"""
+import sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import web_filter
+elapsed = time.perf_counter() - t0
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+except ImportError:
+    rss = -1
+heavy = [m for m in ('pandas', 'pyarrow', 'requests', 'urllib3', 'concurrent.futures') if m in sys.modules]
+print(elapsed, rss, ','.join(heavy))
+"""
+
+
+# 자식 프로세스에서 WebLineFilter를 처음부터 끝까지 실행한 뒤 단계별 시간을 따로 측정하고 JSON으로 출력
+# (이전 커밋과 비교할 수 있도록 생성자는 해당 버전이 지원하는 옵션만 전달)
+RUN_CHILD = r"""
+import os, sys, json, time, codecs, inspect, contextlib
+from urllib.request import urlopen
+spec = json.loads(sys.argv[1])
+sys.path.insert(0, spec['module_dir'])
+import web_filter
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def make_filter():
+    params = inspect.signature(web_filter.WebLineFilter).parameters
+    options = {k: v for k, v in spec['options'].items() if k in params}
+    return web_filter.WebLineFilter(spec['urls_file'], spec['keywords_file'], **options)
+
+def clean_lines(wf, raw):
+    # 실행 경로와 같은 방식으로 정리: 스트리밍 버전은 HtmlLineTokenizer에 조각 단위로, 이전 버전은 _clean_html
+    if not hasattr(web_filter, 'HtmlLineTokenizer'):
+        return wf._clean_html(raw.decode('utf-8')).split('\n')
+    chunk_size = getattr(wf, 'CHUNK_SIZE', 64 * 1024)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    tokenizer = web_filter.HtmlLineTokenizer()
+    lines = []
+    for start in range(0, len(raw), chunk_size):
+        lines += tokenizer.feed(decoder.decode(raw[start:start + chunk_size]))
+    lines += tokenizer.feed(decoder.decode(b'', final=True))
+    lines += tokenizer.close()
+    return lines
+
+result = {}
+with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+    t0 = time.perf_counter()
+    wf = make_filter()
+    result['setup_s'] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    wf.run()
+    result['elapsed_s'] = time.perf_counter() - t0
+    result['max_rss_mb'] = max_rss_mb()
+
+    # 단계별 측정: 같은 페이지를 다시 받아서 본문 수신, HTML 정리, 검색을 따로 측정
+    wf = make_filter()
+    stages = {'fetch': 0.0, 'clean': 0.0, 'search': 0.0}
+    lines_total = matches_total = 0
+    for url in wf.urls:
+        t0 = time.perf_counter()
+        with urlopen(url) as response:
+            raw = response.read()
+        stages['fetch'] += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        lines = clean_lines(wf, raw)
+        stages['clean'] += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        matches_total += len(wf._search_lines(url, lines))
+        stages['search'] += time.perf_counter() - t0
+        lines_total += len(lines)
+    if hasattr(wf, 'close'):
+        wf.close()
+result['stages_s'] = stages
+result['lines'] = lines_total
+result['matches'] = matches_total
+print(json.dumps(result))
+"""
+
+# 합성 페이지와 키워드에 사용할 단어 수
+VOCAB_SIZE = 5000
+
+
+def pseudo_words(rng: random.Random, count: int, exclude: set = frozenset()) -> List[str]:
+    """서로 다른 임의의 영소문자 단어 count개 생성"""
+    words = set()
+    while len(words) < count:
+        word = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12)))
+        if word not in exclude:
+            words.add(word)
+    return sorted(words)
+
+
+def make_page(seed: int, page: int, vocab: List[str], size: int, lines: int,
+              br_density: float) -> bytes:
+    """
+    합성 HTML 페이지 생성 (같은 seed와 페이지 번호면 항상 같은 내용)
+    
+    Args:
+        size: 대략적인 본문 크기 (바이트)
+        lines: 줄 수
+        br_density: 줄 구분에 개행 대신 <br> 계열 태그를 쓰는 비율 (0~1)
+    """
+    rng = random.Random(f'{seed}:{page}')
+    per_line = max(1, size // max(1, lines))
+    parts = [f'<html><head><title>page {page}</title></head><body>\n']
+    for _ in range(lines):
+        line, length = [], 0
+        while length < per_line:
+            r = rng.random()
+            if r < 0.04:
+                word = f'<b>{rng.choice(vocab)}</b>'
+            elif r < 0.06:
+                word = f'<span class="v">version {rng.randint(1, 9)}.{rng.randint(0, 20)}</span>'
+            elif r < 0.08:
+                word = str(rng.randint(1000, 9999))
+            elif r < 0.09:
+                word = '&amp;'
+            else:
+                word = rng.choice(vocab)
+            line.append(word)
+            length += len(word) + 1
+        parts.append(' '.join(line))
+        parts.append(rng.choice(('<br>', '<br/>', '<BR />')) if rng.random() < br_density else '\n')
+    parts.append('</body></html>\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def make_keywords(seed: int, count: int, vocab: List[str]) -> List[str]:
+    """
+    키워드 목록 생성: 정규식 몇 개와 페이지에 나오는 단어/나오지 않는 단어를 절반씩
+    """
+    rng = random.Random(f'{seed}:keywords:{count}')
+    regexes = ['<<REGEX>>version\\s+\\d+\\.\\d+', '<<REGEX>>\\b\\d{4}\\b', '<<REGEX>>error|warning']
+    regexes = regexes[:max(0, min(len(regexes), count // 10))]
+    remaining = count - len(regexes)
+    hits = rng.sample(vocab, min(len(vocab), remaining // 2, 50))
+    misses = pseudo_words(rng, remaining - len(hits), exclude=set(vocab))
+    keywords = hits + misses
+    rng.shuffle(keywords)
+    return regexes + keywords
+
+
+class FakeSite:
+    """
+    합성 페이지를 제공하는 로컬 HTTP 서버 (/page/<번호>)
+    
+    페이지 생성 시간이 측정에 섞이지 않도록 모든 페이지를 미리 만들어 두고,
+    요청마다 latency초 뒤에 응답합니다.
+    """
+    
+    def __init__(self, seed: int, pages: int, size: int, lines: int, latency: float, br_density: float):
+        self.latency = latency
+        self.vocab = pseudo_words(random.Random(seed), VOCAB_SIZE)
+        self.pages = [make_page(seed, n, self.vocab, size, lines, br_density) for n in range(pages)]
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+    
+    @property
+    def urls(self) -> List[str]:
+        return [f'{self.base_url}/page/{n}' for n in range(len(self.pages))]
+    
+    def _handler_class(self):
+        site = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_GET(self):
+                parts = self.path.strip('/').split('/')
+                if len(parts) != 2 or parts[0] != 'page' or not parts[1].isdigit() \
+                        or int(parts[1]) >= len(site.pages):
+                    self.send_error(404)
+                    return
+                body = site.pages[int(parts[1])]
+                if site.latency:
+                    time.sleep(site.latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+    
+    def __enter__(self) -> 'FakeSite':
+        self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def resolve_commit(rev: Optional[str] = None) -> Optional[str]:
+    """커밋 해시 반환 (rev가 None이면 HEAD, 작업 트리에 변경 사항이 있으면 '-dirty' 추가)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', rev or 'HEAD'], cwd=BENCH_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        if rev is None:
+            dirty = subprocess.run(['git', 'status', '--porcelain', '--', 'web_filter.py'], cwd=BENCH_DIR,
+                                   capture_output=True, text=True, check=True).stdout.strip()
+            if dirty:
+                commit += '-dirty'
+        return commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def checkout_revision(rev: str, dest: str) -> str:
+    """git 커밋의 web_filter.py를 임시 디렉터리에 꺼내고 그 디렉터리 경로 반환"""
+    prefix = subprocess.run(['git', 'rev-parse', '--show-prefix'], cwd=BENCH_DIR,
+                            capture_output=True, text=True, check=True).stdout.strip()
+    source = subprocess.run(['git', 'show', f'{rev}:{prefix}web_filter.py'], cwd=BENCH_DIR,
+                            capture_output=True, check=True).stdout
+    target_dir = os.path.join(dest, rev.replace('/', '_').replace('~', '_').replace('^', '_'))
+    os.makedirs(target_dir, exist_ok=True)
+    with open(os.path.join(target_dir, 'web_filter.py'), 'wb') as f:
+        f.write(source)
+    return target_dir
+
+
+def measure_startup(module_dir: str, repeat: int) -> Dict[str, object]:
+    """web_filter import 시간과 프로세스 전체 시작 시간을 repeat번 측정"""
+    wall, imports, rss = [], [], []
+    heavy = ''
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', STARTUP_CHILD, module_dir],
+                                capture_output=True, text=True)
+        wall.append(time.perf_counter() - t0)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        elapsed, max_rss, heavy = (result.stdout.strip().split(' ') + [''])[:3]
+        imports.append(float(elapsed))
+        rss.append(int(max_rss))
+    return {
+        'wall_ms': round(median(wall) * 1000, 1),
+        'import_ms': round(median(imports) * 1000, 1),
+        'import_min_ms': round(min(imports) * 1000, 1),
+        'max_rss_mb': round(max(rss) / 1024, 1) if max(rss) >= 0 else None,
+        'heavy_modules': heavy.split(',') if heavy else [],
+    }
+
+
+def measure_run(module_dir: str, urls_file: str, keywords_file: str,
+                options: Dict[str, object]) -> Dict[str, object]:
+    """자식 프로세스에서 WebLineFilter 전체 실행과 단계별 시간을 측정"""
+    spec = {'module_dir': module_dir, 'urls_file': urls_file, 'keywords_file': keywords_file,
+            'options': options}
+    result = subprocess.run([sys.executable, '-c', RUN_CHILD, json.dumps(spec)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def cmd_run(args) -> List[Dict[str, object]]:
+    """로컬 합성 사이트를 대상으로 처리량, 최대 RSS, 단계별 시간 측정"""
+    keyword_counts = [int(n) for n in args.keywords.split(',')]
+    options = {'workers': args.workers, 'per_host': args.workers, 'cache_dir': None}
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeSite(args.seed, args.pages, args.page_size, args.lines, args.latency,
+                     args.br_density) as site:
+        urls_file = os.path.join(tmp, 'urls.txt')
+        with open(urls_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(site.urls) + '\n')
+        
+        targets = [('working tree', BENCH_DIR, resolve_commit())]
+        targets += [(rev, checkout_revision(rev, tmp), resolve_commit(rev)) for rev in args.against]
+        for count in keyword_counts:
+            keywords_file = os.path.join(tmp, f'keywords_{count}.txt')
+            with open(keywords_file, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(make_keywords(args.seed, count, site.vocab)) + '\n')
+            
+            for label, module_dir, commit in targets:
+                for _ in range(args.repeat):
+                    measured = measure_run(module_dir, urls_file, keywords_file, options)
+                    elapsed = measured['elapsed_s']
+                    stages = measured['stages_s']
+                    results.append({
+                        'target': label,
+                        'commit': commit,
+                        'keywords': count,
+                        'pages': args.pages,
+                        'lines': measured['lines'],
+                        'matches': measured['matches'],
+                        'setup_s': round(measured['setup_s'], 3),
+                        'elapsed_s': round(elapsed, 3),
+                        'pages_per_s': round(args.pages / elapsed, 1),
+                        'lines_per_s': round(measured['lines'] / elapsed),
+                        'max_rss_mb': measured['max_rss_mb'],
+                        'fetch_ms_per_page': round(stages['fetch'] * 1000 / args.pages, 2),
+                        'clean_ms_per_page': round(stages['clean'] * 1000 / args.pages, 2),
+                        'search_ms_per_page': round(stages['search'] * 1000 / args.pages, 2),
+                    })
+    
+    print(f"{'대상':<16} {'키워드':>7} {'준비(s)':>8} {'pages/s':>8} {'lines/s':>10} {'RSS(MB)':>8} "
+          f"{'fetch(ms)':>10} {'clean(ms)':>10} {'search(ms)':>11}")
+    print("-" * 100)
+    for r in results:
+        rss = '-' if r['max_rss_mb'] is None else f"{r['max_rss_mb']:.1f}"
+        print(f"{r['target']:<16} {r['keywords']:>7} {r['setup_s']:>8.2f} {r['pages_per_s']:>8.1f} "
+              f"{r['lines_per_s']:>10} {rss:>8} {r['fetch_ms_per_page']:>10.2f} "
+              f"{r['clean_ms_per_page']:>10.2f} {r['search_ms_per_page']:>11.2f}")
+    print("\n단계별 시간은 페이지당 평균입니다. fetch는 요청과 본문 수신, clean은 HTML 정리")
+    print("(HtmlLineTokenizer, 이전 버전은 _clean_html), search는 _search_lines 시간입니다.")
+    return results
+
+
+def cmd_startup(args) -> List[Dict[str, object]]:
+    """시작 시간 측정 (import 비용, 최대 RSS)"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = [('working tree', BENCH_DIR, resolve_commit())]
+        targets += [(rev, checkout_revision(rev, tmp), resolve_commit(rev)) for rev in args.against]
+        for label, module_dir, commit in targets:
+            result = measure_startup(module_dir, args.repeat)
+            result['target'] = label
+            result['commit'] = commit
+            results.append(result)
+
+    print(f"{'대상':<16} {'프로세스(ms)':>12} {'import(ms)':>11} {'최소(ms)':>9} {'RSS(MB)':>8}  무거운 모듈")
+    print("-" * 80)
+    for r in results:
+        rss = '-' if r['max_rss_mb'] is None else f"{r['max_rss_mb']:.1f}"
+        print(f"{r['target']:<16} {r['wall_ms']:>12.1f} {r['import_ms']:>11.1f} "
+              f"{r['import_min_ms']:>9.1f} {rss:>8}  {', '.join(r['heavy_modules']) or '-'}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='web_filter.py 성능을 측정합니다.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+사용 예제:
+  python web_filter_bench.py startup
+  python web_filter_bench.py startup --against HEAD~1 --repeat 20
+  python web_filter_bench.py startup --json startup.json
+  python web_filter_bench.py run
+  python web_filter_bench.py run --keywords 10,1000 --pages 50 --latency 0.05 --against HEAD~3
+  python web_filter_bench.py --json run.json run --page-size 262144 --lines 4000 --br-density 0.8
+        """
+    )
+    parser.add_argument('--json', help='측정 결과를 저장할 JSON 파일 경로', default=None)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    startup = subparsers.add_parser('startup', help='모듈 import 시간과 메모리 측정')
+    startup.add_argument('--repeat', type=int, default=10, help='반복 횟수 (기본값: 10)')
+    startup.add_argument('--against', action='append', default=[], metavar='REV',
+                         help='비교할 git 커밋 (여러 번 지정 가능)')
+    startup.set_defaults(func=cmd_startup)
+    
+    run = subparsers.add_parser('run', help='로컬 합성 사이트를 대상으로 처리량과 단계별 시간 측정')
+    run.add_argument('--keywords', default='10,1000,100000',
+                     help='측정할 키워드 개수 목록, 쉼표로 구분 (기본값: 10,1000,100000)')
+    run.add_argument('--pages', type=int, default=20, help='페이지 수 (기본값: 20)')
+    run.add_argument('--page-size', type=int, default=64 * 1024,
+                     help='페이지당 대략적인 본문 크기, 바이트 단위 (기본값: 65536)')
+    run.add_argument('--lines', type=int, default=1000, help='페이지당 줄 수 (기본값: 1000)')
+    run.add_argument('--latency', type=float, default=0.02,
+                     help='서버 응답 지연, 초 단위 (기본값: 0.02)')
+    run.add_argument('--br-density', type=float, default=0.3,
+                     help='줄 구분에 <br> 태그를 쓰는 비율, 0~1 (기본값: 0.3)')
+    run.add_argument('--workers', type=int, default=8,
+                     help='WebLineFilter 워커 수, 지원하지 않는 버전은 무시 (기본값: 8)')
+    run.add_argument('--seed', type=int, default=1, help='페이지/키워드 생성 시드 (기본값: 1)')
+    run.add_argument('--repeat', type=int, default=1, help='반복 횟수 (기본값: 1)')
+    run.add_argument('--against', action='append', default=[], metavar='REV',
+                     help='비교할 git 커밋 (여러 번 지정 가능)')
+    run.set_defaults(func=cmd_run)
+
+    args = parser.parse_args()
+    results = args.func(args)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'command': args.command, 'commit': resolve_commit(),
+                       'options': {k: v for k, v in vars(args).items() if k not in ('func', 'json')},
+                       'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ 측정 결과가 '{args.json}'에 저장되었습니다.")
+
+
+if __name__ == '__main__':
+    main()